@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+from aiohttp import ClientConnectionError
+
+from async_pluct.http import host_of
+from async_pluct.retry import get_error_status
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+
+    def __init__(self, host, retry_after):
+        super(CircuitOpenError, self).__init__(
+            'Circuit open for {0}, retry in {1:.2f}s'.format(
+                host, retry_after))
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, host, failure_threshold=5, recovery_timeout=30,
+                 half_open_requests=1, clock=time.monotonic, on_change=None):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_requests = half_open_requests
+        self.clock = clock
+        self.on_change = on_change
+
+        self._state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trials = 0
+
+        self.total_successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if (self._state == OPEN and
+                self.clock() - self.opened_at >= self.recovery_timeout):
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def retry_after(self):
+        if self._state != OPEN:
+            return 0
+        return max(0, self.opened_at + self.recovery_timeout - self.clock())
+
+    def before_request(self):
+        state = self.state
+        if state == CLOSED:
+            return
+
+        if state == HALF_OPEN and self.trials < self.half_open_requests:
+            self.trials += 1
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError(self.host, self.retry_after())
+
+    def record_success(self):
+        self.total_successes += 1
+        self.failures = 0
+        if self._state == HALF_OPEN:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self.total_failures += 1
+        self.failures += 1
+        if self._state == HALF_OPEN or (
+                self._state == CLOSED and
+                self.failures >= self.failure_threshold):
+            self._transition(OPEN)
+
+    def release(self):
+        # A half-open trial that ended without an answer, e.g. cancelled
+        if self._state == HALF_OPEN and self.trials:
+            self.trials -= 1
+
+    def _transition(self, state):
+        previous = self._state
+        self._state = state
+        self.trials = 0
+        if state == OPEN:
+            self.opened_at = self.clock()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self.failures = 0
+            self.opened_at = None
+
+        if self.on_change is not None and previous != state:
+            self.on_change(self.host, previous, state)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_after': self.retry_after(),
+            'total_successes': self.total_successes,
+            'total_failures': self.total_failures,
+            'rejected': self.rejected,
+            'times_opened': self.times_opened,
+        }
+
+
+class CircuitBreakers(object):
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30,
+                 half_open_requests=1,
+                 errors=(ClientConnectionError, asyncio.TimeoutError),
+                 min_status=500, clock=time.monotonic, on_change=None):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_requests = half_open_requests
+        self.errors = errors
+        self.min_status = min_status
+        self.clock = clock
+        self.on_change = on_change
+        self._breakers = {}
+
+    def for_url(self, url):
+        host = host_of(url)
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                host, failure_threshold=self.failure_threshold,
+                recovery_timeout=self.recovery_timeout,
+                half_open_requests=self.half_open_requests,
+                clock=self.clock, on_change=self._changed)
+        return breaker
+
+    def _changed(self, host, previous, state):
+        if self.on_change is not None:
+            self.on_change(host, previous, state)
+
+    def is_failure(self, error):
+        # Client errors mean the host answered, so they count as success
+        if isinstance(error, self.errors):
+            return True
+        status = get_error_status(error)
+        return status is not None and status >= self.min_status
+
+    def record_error(self, breaker, error):
+        if self.is_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def state(self, url):
+        breaker = self._breakers.get(host_of(url))
+        if breaker is None:
+            return CLOSED
+        return breaker.state
+
+    def stats(self):
+        return dict(
+            (host, breaker.stats())
+            for host, breaker in self._breakers.items())
+
+    def reset(self, url=None):
+        if url is None:
+            self._breakers.clear()
+        else:
+            self._breakers.pop(host_of(url), None)
+
+    def __len__(self):
+        return len(self._breakers)
@@ -0,0 +1,309 @@
+import time
+
+from collections import OrderedDict
+from email.utils import parsedate_tz, mktime_tz
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from multidict import CIMultiDict
+
+
+CACHEABLE_METHODS = ('GET',)
+CACHEABLE_STATUSES = (200, 203)
+INVALIDATING_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Headers that a 304 response must not overwrite on the stored entry
+# (RFC 7234, section 4.3.4)
+UNUPDATABLE_HEADERS = ('content-length', 'content-encoding',
+                       'transfer-encoding')
+
+# Fraction of the Last-Modified age used as heuristic freshness
+# (RFC 7234, section 4.2.2)
+HEURISTIC_FRACTION = 0.1
+
+
+def parse_cache_control(value):
+    directives = {}
+    if not value:
+        return directives
+
+    for part in value.split(','):
+        name, _, argument = part.strip().partition('=')
+        name = name.strip().lower()
+        if not name:
+            continue
+        directives[name] = argument.strip().strip('"') or None
+    return directives
+
+
+def parse_http_date(value):
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
+
+
+def parse_seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def conditional_headers(etag, last_modified):
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def get_status(response):
+    status = getattr(response, 'status', None)
+    if status is None:
+        status = getattr(response, 'code', None)
+    return status
+
+
+class CachedResponse(object):
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.code = status
+        self.headers = CIMultiDict(headers)
+        self.body = body
+        self.request = lambda: None
+        self.request.url = url
+
+    @classmethod
+    def from_response(cls, url, response):
+        request = getattr(response, 'request', None)
+        url = getattr(request, 'url', None) or url
+        return cls(url, get_status(response), response.headers, response.body)
+
+    def __repr__(self):
+        return '<CachedResponse %s %s>' % (self.status, self.url)
+
+
+class CacheEntry(object):
+
+    def __init__(self, response, request_time, response_time, vary=None):
+        self.response = response
+        self.request_time = request_time
+        self.response_time = response_time
+        self.vary = vary or {}
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(self.headers.get('cache-control'))
+
+    @property
+    def etag(self):
+        return self.headers.get('etag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('last-modified')
+
+    def has_validator(self):
+        return bool(self.etag or self.last_modified)
+
+    def freshness_lifetime(self):
+        directives = self.cache_control
+
+        max_age = parse_seconds(directives.get('max-age'))
+        if max_age is not None:
+            return max_age
+
+        date = parse_http_date(self.headers.get('date'))
+        if date is None:
+            date = self.response_time
+
+        if 'expires' in self.headers:
+            expires = parse_http_date(self.headers['expires'])
+            if expires is None:
+                return 0
+            return max(0, expires - date)
+
+        last_modified = parse_http_date(self.last_modified)
+        if last_modified is not None:
+            return max(0, (date - last_modified) * HEURISTIC_FRACTION)
+
+        return 0
+
+    def current_age(self, now):
+        date = parse_http_date(self.headers.get('date'))
+        apparent_age = 0
+        if date is not None:
+            apparent_age = max(0, self.response_time - date)
+
+        response_delay = self.response_time - self.request_time
+        age_value = parse_seconds(self.headers.get('age')) or 0
+        corrected_age_value = age_value + response_delay
+
+        initial_age = max(apparent_age, corrected_age_value)
+        resident_time = now - self.response_time
+        return initial_age + resident_time
+
+    def is_fresh(self, now):
+        directives = self.cache_control
+        if 'no-cache' in directives:
+            return False
+        return self.freshness_lifetime() > self.current_age(now)
+
+    def conditional_headers(self):
+        return conditional_headers(self.etag, self.last_modified)
+
+    def matches(self, request_headers):
+        request_headers = CIMultiDict(request_headers or {})
+        for name, value in self.vary.items():
+            if request_headers.get(name) != value:
+                return False
+        return True
+
+
+class MemoryCacheStorage(object):
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HTTPCache(object):
+
+    def __init__(self, storage=None, clock=time.time):
+        if storage is None:
+            storage = MemoryCacheStorage()
+        self.storage = storage
+        self.clock = clock
+
+    def key(self, url, params=None):
+        url = str(url)
+        if not params:
+            return url
+        query = urlencode(sorted(
+            (str(name), str(value)) for name, value in params.items()))
+        separator = '&' if '?' in url else '?'
+        return url + separator + query
+
+    def lookup(self, method, url, headers, params=None):
+        if method.upper() not in CACHEABLE_METHODS:
+            return None
+
+        request_directives = parse_cache_control(
+            CIMultiDict(headers or {}).get('cache-control'))
+        if 'no-store' in request_directives:
+            return None
+
+        entry = self.storage.get(self.key(url, params))
+        if entry is None or not entry.matches(headers):
+            return None
+        return entry
+
+    def is_fresh(self, entry, headers):
+        request_directives = parse_cache_control(
+            CIMultiDict(headers or {}).get('cache-control'))
+        if 'no-cache' in request_directives:
+            return False
+        return entry.is_fresh(self.clock())
+
+    def store(self, method, url, headers, response, request_time,
+              params=None):
+        method = method.upper()
+        key = self.key(url, params)
+
+        if method in INVALIDATING_METHODS:
+            self.storage.delete(key)
+            return None
+
+        if (method not in CACHEABLE_METHODS or
+                get_status(response) not in CACHEABLE_STATUSES):
+            return None
+
+        request_directives = parse_cache_control(
+            CIMultiDict(headers or {}).get('cache-control'))
+        response_directives = parse_cache_control(
+            response.headers.get('cache-control'))
+        if ('no-store' in request_directives or
+                'no-store' in response_directives):
+            self.storage.delete(key)
+            return None
+
+        vary = self._vary_values(response, headers)
+        if vary is None:
+            return None
+
+        entry = CacheEntry(
+            CachedResponse.from_response(url, response),
+            request_time=request_time,
+            response_time=self.clock(),
+            vary=vary)
+
+        if entry.freshness_lifetime() <= 0 and not entry.has_validator():
+            return None
+
+        self.storage.set(key, entry)
+        return entry
+
+    def revalidated(self, url, entry, response, request_time,
+                    params=None):
+        headers = entry.response.headers
+        for name, value in response.headers.items():
+            if name.lower() in UNUPDATABLE_HEADERS:
+                continue
+            headers[name] = value
+
+        entry.request_time = request_time
+        entry.response_time = self.clock()
+        self.storage.set(self.key(url, params), entry)
+        return entry.response
+
+    def _vary_values(self, response, headers):
+        vary_header = response.headers.get('vary')
+        if not vary_header:
+            return {}
+
+        request_headers = CIMultiDict(headers or {})
+        vary = {}
+        for name in vary_header.split(','):
+            name = name.strip().lower()
+            if name == '*':
+                return None
+            if name:
+                vary[name] = request_headers.get(name)
+        return vary
@@ -0,0 +1,107 @@
+import json
+
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.name)
+
+
+class OrjsonCodec(JSONCodec):
+
+    name = 'orjson'
+    module = orjson
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+
+class MsgspecCodec(JSONCodec):
+
+    name = 'msgspec'
+    module = msgspec
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+
+    def loads(self, data):
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # Keep callers that catch ValueError (like json) working
+            raise ValueError(str(e))
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+
+class UjsonCodec(JSONCodec):
+
+    name = 'ujson'
+    module = ujson
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, obj):
+        return ujson.dumps(obj)
+
+
+# Fastest first, used to pick a codec for codec='auto'
+CODECS = OrderedDict(
+    (codec.name, codec)
+    for codec in (OrjsonCodec, MsgspecCodec, UjsonCodec, JSONCodec))
+
+
+def available_codecs():
+    return [name for name, codec in CODECS.items()
+            if getattr(codec, 'module', json) is not None]
+
+
+def get_codec(codec=None):
+    if codec is None:
+        return JSONCodec()
+
+    if not isinstance(codec, str):
+        return codec
+
+    if codec == 'auto':
+        codec = available_codecs()[0]
+
+    if codec not in CODECS:
+        raise ValueError('Unknown JSON codec: {0}'.format(codec))
+
+    if codec not in available_codecs():
+        raise ImportError(
+            'JSON codec {0} is not installed'.format(codec))
+
+    return CODECS[codec]()
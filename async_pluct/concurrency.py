@@ -0,0 +1,81 @@
+import asyncio
+
+
+class SingleFlight(object):
+
+    def __init__(self):
+        self._futures = {}
+
+    def __contains__(self, key):
+        return key in self._futures
+
+    def __len__(self):
+        return len(self._futures)
+
+    async def do(self, key, factory):
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._futures[key] = future
+            future.add_done_callback(
+                lambda done: self._forget(key, done))
+
+        # Shield the shared future so a cancelled waiter doesn't cancel
+        # the fetch for everybody else
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._futures.get(key) is future:
+            del self._futures[key]
+
+        # Mark the exception as retrieved when every waiter went away
+        if not future.cancelled():
+            future.exception()
+
+
+async def _bounded_call(factory, semaphores):
+    if not semaphores:
+        return await factory()
+    async with semaphores[0]:
+        return await _bounded_call(factory, semaphores[1:])
+
+
+async def _collect(index, factory, semaphores):
+    try:
+        return index, await _bounded_call(factory, semaphores)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return index, e
+
+
+def _schedule(factories, limit, shared):
+    # The per-call limit is taken first, so a batch waiting on its own
+    # limit doesn't hold slots of the shared semaphore
+    semaphores = []
+    if limit:
+        semaphores.append(asyncio.Semaphore(limit))
+    if shared is not None:
+        semaphores.append(shared)
+    return [asyncio.ensure_future(_collect(index, factory, semaphores))
+            for index, factory in enumerate(factories)]
+
+
+async def gather_bounded(factories, limit=None, shared=None):
+    tasks = _schedule(factories, limit, shared)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return [result for _, result in results]
+
+
+async def as_completed_bounded(factories, limit=None, shared=None):
+    tasks = _schedule(factories, limit, shared)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
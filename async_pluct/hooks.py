@@ -0,0 +1,151 @@
+import time
+
+from bisect import bisect_left
+from collections import Counter
+
+
+REQUEST_START = 'request_start'
+REQUEST_END = 'request_end'
+SCHEMA_FETCH = 'schema_fetch'
+STORE_HIT = 'store_hit'
+STORE_MISS = 'store_miss'
+PARSE = 'parse'
+VALIDATION = 'validation'
+CIRCUIT_STATE = 'circuit_state'
+
+EVENTS = (REQUEST_START, REQUEST_END, SCHEMA_FETCH, STORE_HIT, STORE_MISS,
+          PARSE, VALIDATION, CIRCUIT_STATE)
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+clock = time.perf_counter
+
+
+class Hooks(object):
+    # Listeners are called as listener(event, **data). An empty registry
+    # is falsy so callers can skip reading the clock when nobody listens.
+
+    def __init__(self):
+        self._listeners = {}
+
+    def on(self, event, listener):
+        if event not in EVENTS:
+            raise ValueError('Unknown event: {0}'.format(event))
+        self._listeners.setdefault(event, []).append(listener)
+        return listener
+
+    def off(self, event, listener):
+        listeners = self._listeners.get(event, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            self._listeners.pop(event, None)
+
+    def emit(self, event, **data):
+        for listener in self._listeners.get(event, ()):
+            listener(event, **data)
+
+    def __contains__(self, event):
+        return event in self._listeners
+
+    def __bool__(self):
+        return bool(self._listeners)
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def percentile(self, percent):
+        # Upper bound of the bucket holding the percentile, capped by the
+        # largest observed value
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class MetricsCollector(object):
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters = Counter()
+        self.histograms = {}
+
+    def attach(self, hooks, events=EVENTS):
+        for event in events:
+            hooks.on(event, self)
+        return self
+
+    def detach(self, hooks, events=EVENTS):
+        for event in events:
+            hooks.off(event, self)
+
+    def __call__(self, event, **data):
+        self.counters[event] += 1
+        if data.get('error') is not None:
+            self.counters[event + '_error'] += 1
+
+        duration = data.get('duration')
+        if duration is not None:
+            self.observe(event, duration)
+
+    def observe(self, name, value):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def snapshot(self):
+        return {
+            'counters': dict(self.counters),
+            'histograms': dict(
+                (name, histogram.snapshot())
+                for name, histogram in self.histograms.items()),
+        }
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
@@ -1,18 +1,57 @@
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+
+def host_of(url):
+    # Rate limits and circuit breakers are both kept per host
+    return urlparse(str(url)).netloc
+
+
+class TransportConfig(object):
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=15,
+                 ttl_dns_cache=10):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+
+
 try:
     from tornado.httpclient import AsyncHTTPClient
 
     http_client = AsyncHTTPClient
+
+    def create_client(transport):
+        # Tornado keeps a single limit for every host
+        return AsyncHTTPClient(force_instance=True,
+                               max_clients=transport.limit)
+
+    def pool_stats(client):
+        return {
+            'limit': getattr(client, 'max_clients', None),
+            'limit_per_host': None,
+            'in_use': len(getattr(client, 'active', ())),
+            'idle': None,
+            'waiting': len(getattr(client, 'queue', ())),
+        }
 except ImportError:
-    from aiohttp import ClientSession
+    from aiohttp import ClientSession, TCPConnector
 
     class AioHttpClient(ClientSession):
-        async def fetch(self, url, **kwargs):
+        def _pop_method(self, kwargs):
             method = kwargs.pop('method', 'GET').lower()
             timeout = kwargs.pop('request_timeout', None)
 
             if timeout:
                 kwargs['read_timeout'] = timeout
 
+            return method
+
+        async def fetch(self, url, **kwargs):
+            method = self._pop_method(kwargs)
             response = await self.request(method, url, **kwargs)
             async with response:
                 response.body = await response.read()
@@ -20,4 +59,30 @@ except ImportError:
                 response.request.url = response.url
                 return response
 
+        def stream(self, url, **kwargs):
+            method = self._pop_method(kwargs)
+            return self.request(method, url, **kwargs)
+
     http_client = AioHttpClient
+
+    def create_client(transport):
+        connector = TCPConnector(
+            limit=transport.limit,
+            limit_per_host=transport.limit_per_host,
+            keepalive_timeout=transport.keepalive_timeout,
+            use_dns_cache=transport.ttl_dns_cache != 0,
+            ttl_dns_cache=transport.ttl_dns_cache)
+        return AioHttpClient(connector=connector)
+
+    def pool_stats(client):
+        connector = client.connector
+        idle = sum(len(conns) for conns in connector._conns.values())
+        waiting = sum(
+            len(waiters) for waiters in connector._waiters.values())
+        return {
+            'limit': connector.limit,
+            'limit_per_host': connector.limit_per_host,
+            'in_use': len(connector._acquired),
+            'idle': idle,
+            'waiting': waiting,
+        }
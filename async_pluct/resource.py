@@ -1,15 +1,23 @@
+import asyncio
 import jsonpointer
-import json
 from collections import UserDict
 from collections import UserList
+from collections.abc import ItemsView, ValuesView
+from functools import partial
 
-from jsonschema import SchemaError, validate, ValidationError, RefResolver
+from jsonschema import SchemaError
 
+from async_pluct.concurrency import as_completed_bounded, gather_bounded
+from async_pluct.hooks import VALIDATION, clock
 from async_pluct.schema import Schema
+from async_pluct.validation import exceeds_size
 
 
 class Resource(object):
 
+    # Lets the compact subclasses drop the instance __dict__
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         raise NotImplementedError(
             'Use subclasses or Resource.from_data to initialize resources')
@@ -17,33 +25,142 @@ class Resource(object):
     def init(self, url, data=None, schema=None, session=None, response=None,
              headers=None):
         self.url = url
-        self.data = data or self.default_data()
+        self.data = self.default_data() if data is None else data
         self.schema = schema
         self.session = session
         self.response = response
         self.headers = headers
+        self._children = {}
+
+    @property
+    def schema(self):
+        if self._schema_loader is not None:
+            self._schema = self._schema_loader()
+            self._schema_loader = None
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = schema
+        self._schema_loader = None
 
     async def session_request_json(self, url):
-        response = await self.session.request(url)
-        return json.loads(response.body)
+        return await self.session.request_json(url)
 
-    async def is_valid(self):
-        handlers = {'https': self.session_request_json,
-                    'http': self.session_request_json}
+    async def is_valid(self, executor=None):
         schema = await self.schema.raw_schema
-        resolver = RefResolver.from_schema(schema,
-                                           handlers=handlers)
         try:
-            validate(self.data, schema, resolver=resolver)
-        except (SchemaError, ValidationError):
+            validator = await self.session.validators.prepare(
+                self.schema.href, schema)
+        except SchemaError:
             return False
-        return True
+
+        if executor is None:
+            executor = self.session.validation_executor
+        if executor is not None and not exceeds_size(
+                self.data, self.session.validation_offload_size):
+            executor = None
+
+        hooks = self.session.hooks
+        if not hooks:
+            return await self._validate(validator, executor)
+
+        start = clock()
+        valid = await self._validate(validator, executor)
+        hooks.emit(VALIDATION, href=self.schema.href, valid=valid,
+                   duration=clock() - start)
+        return valid
+
+    async def _validate(self, validator, executor):
+        if executor is None:
+            return validator.is_valid(self.data)
+        return await self.session.validators.run(
+            executor, self.schema.href, validator, self.data)
 
     async def rel(self, link, **kwargs):
         kwargs['url'] = self.url
         kwargs['resource_params'] = self.data
         return await self.schema.rel(link, **kwargs)
 
+    def _rel_factories(self, links):
+        factories = []
+        for link in links:
+            if isinstance(link, str):
+                name, kwargs = link, {}
+            else:
+                name, kwargs = link
+            factories.append(partial(self.rel, name, **kwargs))
+        return factories
+
+    async def rel_many(self, links, concurrency=None):
+        return await gather_bounded(
+            self._rel_factories(links), concurrency, self.session.slots)
+
+    def iter_rel_many(self, links, concurrency=None):
+        return as_completed_bounded(
+            self._rel_factories(links), concurrency, self.session.slots)
+
+    async def paginate(self, rel='next', prefetch=1, pages=False,
+                       items_key=None, **kwargs):
+        if prefetch < 1:
+            follow = self._follow_pages(rel, kwargs)
+        else:
+            follow = self._prefetch_pages(rel, prefetch, kwargs)
+
+        async for page in follow:
+            if pages:
+                yield page
+                continue
+            for item in page.page_items(items_key):
+                yield item
+
+    async def _follow_pages(self, rel, kwargs):
+        page = self
+        yield page
+        while await page.has_rel_async(rel):
+            page = await page.rel(rel, **kwargs)
+            yield page
+
+    async def _prefetch_pages(self, rel, prefetch, kwargs):
+        queue = asyncio.Queue(maxsize=prefetch)
+
+        async def produce():
+            try:
+                async for page in self._follow_pages(rel, kwargs):
+                    await queue.put((page, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put((None, e))
+            else:
+                await queue.put((None, None))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                page, error = await queue.get()
+                if error is not None:
+                    raise error
+                if page is None:
+                    return
+                yield page
+        finally:
+            producer.cancel()
+
+    def page_items(self, items_key=None):
+        items = self[items_key] if items_key is not None else self
+        if not isinstance(items, list):
+            raise ValueError(
+                'Pass items_key to iterate the items of object pages')
+        for index in range(len(items)):
+            yield items[index]
+
+    async def has_rel_async(self, name):
+        if self.schema is None:
+            return False
+        await self.schema.resolve_data()
+        return self.has_rel(name)
+
     def has_rel(self, name):
         return self.schema.has_rel(name)
 
@@ -53,11 +170,14 @@ class Resource(object):
 
     @classmethod
     def from_data(cls, url, data=None, schema=None, session=None,
-                  response=None, headers=None):
+                  response=None, headers=None, compact=None):
+        if compact is None:
+            compact = getattr(session, 'compact', False)
+
         if isinstance(data, (list, tuple)):
-            klass = ArrayResource
+            klass = CompactArrayResource if compact else ArrayResource
         elif isinstance(data, dict):
-            klass = ObjectResource
+            klass = CompactObjectResource if compact else ObjectResource
         else:
             return data
 
@@ -67,12 +187,13 @@ class Resource(object):
 
     @classmethod
     def from_response(cls, response, session, schema):
+        url = response.request.url
         try:
-            data = json.loads(response.body)
+            data = session.loads(response.body, url)
         except ValueError:
             data = {}
         return cls.from_data(
-            url=response.request.url,
+            url=url,
             data=data,
             session=session,
             schema=schema,
@@ -84,11 +205,40 @@ class Resource(object):
         return jsonpointer.resolve_pointer(self.data, *args, **kwargs)
 
     def __getitem__(self, item):
-        schema = self.item_schema(item)
-        return self.from_data(self.url,
-                              data=self.data[item],
-                              schema=schema,
-                              session=self.session)
+        data = self.data[item]
+
+        cacheable = isinstance(item, (str, int))
+        if cacheable:
+            child = self._children.get(item)
+            # Children wrap the very same object they were built from, so
+            # replacing it in data invalidates the cached wrapper
+            if child is not None and child.data is data:
+                return child
+
+        child = self.from_data(self.url, data=data, session=self.session)
+        if isinstance(child, Resource):
+            child._schema_loader = self._item_schema_loader(item)
+            if cacheable:
+                self._children[item] = child
+        return child
+
+    def item_schema(self, key):
+        return _item_schema(self.schema, self.item_pointer(key), self.session)
+
+    def _item_schema_loader(self, key):
+        # Bound to the parent schema rather than the parent resource, so
+        # a child kept on its own doesn't keep its parent document alive
+        return partial(
+            _item_schema, self.schema, self.item_pointer(key), self.session)
+
+
+def _item_schema(schema, pointer, session):
+    # Item schemas live on their parent schema, so parents with the same
+    # property names don't share them
+    if isinstance(schema, Schema):
+        return schema.subschema(pointer)
+    return Schema.unregistered('#' + pointer, raw_schema=schema,
+                               session=session)
 
 
 def get_content_type_for_resource(resource):
@@ -113,9 +263,8 @@ class ObjectResource(UserDict, Resource, dict):
     def iterate_items(self):
         return iter(self.data.items())
 
-    def item_schema(self, key):
-        href = '#/{0}/{1}'.format(self.SCHEMA_PREFIX, key)
-        return Schema(href, raw_schema=self.schema, session=self.session)
+    def item_pointer(self, key):
+        return '/{0}/{1}'.format(self.SCHEMA_PREFIX, key)
 
     def __ne__(self, other):
         return self.data != other
@@ -143,12 +292,137 @@ class ArrayResource(UserList, Resource, list):
     def iterate_items(self):
         return enumerate(self.data)
 
-    def item_schema(self, key):
-        href = '#/{0}'.format(self.SCHEMA_PREFIX)
-        return Schema(href, raw_schema=self.schema, session=self.session)
+    def item_pointer(self, key):
+        return '/{0}'.format(self.SCHEMA_PREFIX)
+
+    async def validate_items(self, stop_on_first=False, executor=None,
+                             chunk_size=None):
+        if self.schema is None:
+            raise ValueError('Cannot validate items without a schema')
+        return await self.item_schema(0).validate_many(
+            list(self.data), stop_on_first=stop_on_first, executor=executor,
+            chunk_size=chunk_size)
 
     def __getitem__(self, item):
         return Resource.__getitem__(self, item)
 
     def __repr__(self):
         return "<Pluct ArrayResource %s>" % self.data
+
+
+class CompactResource(Resource):
+
+    __slots__ = ()
+
+    def init(self, url, data=None, schema=None, session=None, response=None,
+             headers=None):
+        self.url = url
+        self.schema = schema
+        self.session = session
+        self.response = response
+        self.headers = headers
+
+    @property
+    def data(self):
+        return self
+
+    def _wrap(self, item, value):
+        child = self.from_data(
+            self.url, data=value, session=self.session, compact=True)
+        child._schema_loader = self._item_schema_loader(item)
+        return child
+
+
+# Compact resources are the dict/list holding their data, with slots
+# instead of an instance __dict__. Nested containers are replaced in
+# place by compact resources the first time they are accessed.
+class CompactObjectResource(CompactResource, dict):
+
+    __slots__ = ('url', 'session', 'response', 'headers', '_schema',
+                 '_schema_loader')
+
+    SCHEMA_PREFIX = ObjectResource.SCHEMA_PREFIX
+
+    default_data = ObjectResource.default_data
+    iterate_items = ObjectResource.iterate_items
+    item_pointer = ObjectResource.item_pointer
+
+    def __init__(self, url, data=None, **kwargs):
+        dict.__init__(self, data or ())
+        self.init(url, **kwargs)
+
+    def __getitem__(self, item):
+        value = dict.__getitem__(self, item)
+        if isinstance(value, (dict, list)) and not isinstance(value, Resource):
+            value = self._wrap(item, value)
+            dict.__setitem__(self, item, value)
+        return value
+
+    # Reads go through __getitem__, so they return compact resources like
+    # the mapping methods of ObjectResource do
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return self[key]
+        return default
+
+    def values(self):
+        return ValuesView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def pop(self, key, *default):
+        if not dict.__contains__(self, key):
+            return dict.pop(self, key, *default)
+        value = self[key]
+        dict.__delitem__(self, key)
+        return value
+
+    def __repr__(self):
+        return "<Pluct ObjectResource %s>" % dict.__repr__(self)
+
+
+class CompactArrayResource(CompactResource, list):
+
+    __slots__ = ('url', 'session', 'response', 'headers', '_schema',
+                 '_schema_loader')
+
+    SCHEMA_PREFIX = ArrayResource.SCHEMA_PREFIX
+
+    default_data = ArrayResource.default_data
+    iterate_items = ArrayResource.iterate_items
+    item_pointer = ArrayResource.item_pointer
+    validate_items = ArrayResource.validate_items
+
+    def __init__(self, url, data=None, **kwargs):
+        list.__init__(self, data or ())
+        self.init(url, **kwargs)
+
+    def __getitem__(self, item):
+        value = list.__getitem__(self, item)
+        if isinstance(item, slice):
+            return self.from_data(
+                self.url, data=value, schema=self.schema,
+                session=self.session, compact=True)
+
+        if isinstance(value, (dict, list)) and not isinstance(value, Resource):
+            value = self._wrap(item, value)
+            list.__setitem__(self, item, value)
+        return value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self):
+        for index in reversed(range(len(self))):
+            yield self[index]
+
+    def pop(self, index=-1):
+        value = self[index]
+        list.pop(self, index)
+        return value
+
+    def __repr__(self):
+        return "<Pluct ArrayResource %s>" % list.__repr__(self)
@@ -0,0 +1,112 @@
+import asyncio
+import random
+import time
+
+from collections import deque
+
+from aiohttp import ClientConnectionError
+
+from async_pluct.cache import parse_http_date
+
+
+IDEMPOTENT_METHODS = frozenset(
+    ['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'])
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+# Tornado reports connection failures and timeouts as HTTP 599
+CONNECTION_ERROR_STATUS = 599
+
+
+def get_error_status(error):
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    return status
+
+
+def get_error_headers(error):
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    return headers or {}
+
+
+def parse_retry_after(value, clock=time.time):
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    date = parse_http_date(value)
+    if date is None:
+        return None
+    return max(0, date - clock())
+
+
+class RetryPolicy(object):
+
+    def __init__(self, total=3, backoff_factor=0.1, max_backoff=10,
+                 statuses=RETRY_STATUSES, methods=IDEMPOTENT_METHODS,
+                 errors=(ClientConnectionError, asyncio.TimeoutError),
+                 respect_retry_after=True, jitter=True):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.methods = methods
+        self.errors = errors
+        self.respect_retry_after = respect_retry_after
+        self.jitter = jitter
+
+    def is_retryable_error(self, error):
+        if isinstance(error, self.errors):
+            return True
+        status = get_error_status(error)
+        return status in self.statuses or status == CONNECTION_ERROR_STATUS
+
+    def should_retry(self, method, attempt, error):
+        return (attempt < self.total and
+                method.upper() in self.methods and
+                self.is_retryable_error(error))
+
+    def backoff(self, attempt, error=None):
+        if self.respect_retry_after and error is not None:
+            retry_after = parse_retry_after(
+                get_error_headers(error).get('retry-after'))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            # "Full jitter": spread retries over the whole window
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class HedgePolicy(object):
+
+    def __init__(self, percentile=95, min_samples=20, window=1000,
+                 delay=None, min_delay=0.0, methods=('GET', 'HEAD')):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.fixed_delay = delay
+        self.min_delay = min_delay
+        self.methods = methods
+        self._samples = deque(maxlen=window)
+
+    def applies_to(self, method):
+        return method.upper() in self.methods
+
+    def record(self, latency):
+        self._samples.append(latency)
+
+    def delay(self):
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+
+        if len(self._samples) < max(1, self.min_samples):
+            return None
+
+        samples = sorted(self._samples)
+        index = int(round((len(samples) - 1) * self.percentile / 100.0))
+        return max(self.min_delay, samples[index])
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from async_pluct.http import host_of
+
+
+# Lower values are dispatched first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _HostQueue(object):
+
+    __slots__ = ('bucket', 'waiters', 'timer')
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.waiters = []
+        self.timer = None
+
+
+class Scheduler(object):
+    # Requests wait on a future in a per-host heap ordered by priority and
+    # arrival. A single timer per host wakes the head of the heap when the
+    # bucket refills, so waiting never polls.
+
+    def __init__(self, rate=None, burst=None, rates=None,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.clock = clock
+        self._queues = {}
+        self._sequence = itertools.count()
+
+    def _queue(self, host):
+        queue = self._queues.get(host)
+        if queue is None:
+            rate, burst = self.rates.get(host, (self.rate, self.burst))
+            bucket = None
+            if rate is not None:
+                bucket = TokenBucket(rate, burst, clock=self.clock)
+            queue = self._queues[host] = _HostQueue(bucket)
+        return queue
+
+    def try_acquire(self, url):
+        # Takes a token only if one is free now, without queueing
+        queue = self._queue(host_of(url))
+        if queue.bucket is None:
+            return True
+
+        if not queue.waiters and queue.bucket.wait_time() == 0:
+            queue.bucket.take()
+            return True
+        return False
+
+    async def acquire(self, url, priority=NORMAL):
+        if self.try_acquire(url):
+            return
+
+        queue = self._queue(host_of(url))
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(
+            queue.waiters, (priority, next(self._sequence), future))
+        self._dispatch(queue)
+        await future
+
+    def _dispatch(self, queue):
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+
+        while queue.waiters:
+            future = queue.waiters[0][2]
+            if future.done():
+                # Cancelled while waiting
+                heapq.heappop(queue.waiters)
+                continue
+
+            wait = queue.bucket.wait_time()
+            if wait > 0:
+                queue.timer = asyncio.get_event_loop().call_later(
+                    wait, self._dispatch, queue)
+                return
+
+            heapq.heappop(queue.waiters)
+            queue.bucket.take()
+            future.set_result(None)
+
+    def stats(self):
+        return dict(
+            (host, {
+                'waiting': sum(
+                    1 for _, _, future in queue.waiters if not future.done()),
+                'tokens': queue.bucket.tokens if queue.bucket else None,
+            })
+            for host, queue in self._queues.items())
@@ -1,9 +1,7 @@
-import uritemplate
-import json
-
-from cgi import parse_header
 from collections import UserDict
+from functools import lru_cache
 from jsonpointer import resolve_pointer
+from uritemplate import URITemplate
 
 try:
     from urllib.parse import urlparse, urljoin
@@ -12,6 +10,8 @@ except ImportError:
 
 import async_pluct
 
+from async_pluct.hooks import STORE_HIT, STORE_MISS
+
 
 class ResolveAsyncSchemaError(Exception):
     pass
@@ -25,8 +25,14 @@ class Schema(UserDict):
 
         session = kwargs['session']
 
-        if href in session.store:
-            return session.store[href]
+        instance = session.store.get(href)
+        if instance is not None:
+            if session.hooks:
+                session.hooks.emit(STORE_HIT, href=href)
+            return instance
+
+        if session.hooks:
+            session.hooks.emit(STORE_MISS, href=href)
 
         instance = super(Schema, cls).__new__(cls)
         session.store[href] = instance
@@ -41,6 +47,8 @@ class Schema(UserDict):
     def __init__(self, href, raw_schema=None, session=None):
         self._init_href(href)
         self._data = None
+        self._reset_links()
+        self._subschemas = {}
         self._raw_schema = raw_schema
         self.session = session
 
@@ -48,29 +56,6 @@ class Schema(UserDict):
     def __class__(self):
         return dict
 
-    def _is_simple_dict(self, obj):
-        return isinstance(obj, dict) and (not isinstance(obj, Schema))
-
-    def expand_refs(self, item):
-        if self._is_simple_dict(item):
-            iterator = iter(item.items())
-        elif isinstance(item, list):
-            iterator = enumerate(item)
-        else:
-            return
-
-        for key, value in iterator:
-            key_ref_in_dict = (
-                self._is_simple_dict(value) and ('$ref' in value)
-            )
-
-            if key_ref_in_dict:
-                item[key] = self.from_href(
-                    value['$ref'], raw_schema=self._raw_schema,
-                    session=self.session)
-                continue
-            self.expand_refs(value)
-
     @property
     def data(self):
         if self._data is None:
@@ -87,6 +72,21 @@ class Schema(UserDict):
     async def raw_schema(self):
         return self._raw_schema
 
+    @classmethod
+    def unregistered(cls, href, raw_schema=None, session=None):
+        # Kept out of the session store, whose hrefs can't tell the same
+        # pointer under different parent schemas apart
+        instance = super(Schema, cls).__new__(cls)
+        instance.__init__(href, raw_schema=raw_schema, session=session)
+        return instance
+
+    def subschema(self, pointer):
+        schema = self._subschemas.get(pointer)
+        if schema is None:
+            schema = self._subschemas[pointer] = Schema.unregistered(
+                '#' + pointer, raw_schema=self, session=self.session)
+        return schema
+
     @classmethod
     def from_href(cls, href, raw_schema, session):
         href, url, pointer = cls._split_href(href)
@@ -101,27 +101,52 @@ class Schema(UserDict):
         if self._raw_schema is None:
             raise ResolveAsyncSchemaError("resolve_sync")
         data = resolve_pointer(self._raw_schema, self.pointer)
-        self.expand_refs(data)
-        return data
+        return self.expand_ref(data)
 
     async def resolve(self):
         raw_schema = await self.raw_schema
         data = resolve_pointer(raw_schema, self.pointer)
-        self.expand_refs(data)
-        return data
+        return self.expand_ref(data)
+
+    def expand_ref(self, value):
+        if not _is_raw(value):
+            return value
+        if isinstance(value, dict) and '$ref' in value:
+            return self.from_href(
+                value['$ref'], raw_schema=self._raw_schema,
+                session=self.session)
+        return _lazy(value, self)
+
+    def _reset_links(self):
+        self._links = None
+        self._templates = {}
+
+    @property
+    def link_index(self):
+        if self._links is None:
+            links = {}
+            for link in self.data.get('links', []):
+                links.setdefault(link.get('rel'), link)
+            self._links = links
+        return self._links
 
     def get_link(self, name):
-        data = self.data
-        links = data.get('links', [])
-        for link in links:
-            if link.get('rel') == name:
-                return link
-        return None
+        return self.link_index.get(name)
+
+    def get_template(self, name):
+        template = self._templates.get(name)
+        if template is None:
+            link = self.get_link(name)
+            if not link:
+                return None
+            template = URITemplate(link.get('href', ''))
+            self._templates[name] = template
+        return template
 
     async def rel(self, name, **kwargs):
         link = self.get_link(name)
         method = link.get('method', 'GET')
-        href = link.get('href', '')
+        template = self.get_template(name)
 
         context = {}
         params = kwargs.get('params', {})
@@ -131,15 +156,15 @@ class Schema(UserDict):
 
         context.update(params)
 
-        variables = uritemplate.variables(href)
+        variables = template.variable_names
 
-        uri = self.expand_uri(name, context)
+        uri = template.expand(context)
 
         if not urlparse(uri).netloc:
             url = self.url
             if 'url' in kwargs:
                 url = kwargs.pop('url')
-            uri = urljoin(url, uri)
+            uri = urljoin(str(url), uri)
 
         if 'params' in kwargs:
             unused_params = {
@@ -151,13 +176,13 @@ class Schema(UserDict):
             headers = kwargs.get('headers', {})
 
             if isinstance(resource, async_pluct.resource.Resource):
-                kwargs["data"] = json.dumps(resource.data)
+                kwargs["data"] = self.session.codec.dumps(resource.data)
                 headers.setdefault(
                     'content-type',
                     async_pluct.resource.get_content_type_for_resource(resource))  # noqa
 
             elif isinstance(resource, dict):
-                kwargs["data"] = json.dumps(resource)
+                kwargs["data"] = self.session.codec.dumps(resource)
                 headers.setdefault('content-type', 'application/json')
 
             kwargs['headers'] = headers
@@ -167,16 +192,28 @@ class Schema(UserDict):
 
         return await self.session.resource(uri, method=method, **kwargs)
 
+    async def validate_many(self, items, stop_on_first=False, executor=None,
+                            chunk_size=None):
+        documents = [
+            item.data if isinstance(item, async_pluct.resource.Resource)
+            else item
+            for item in items]
+        kwargs = {}
+        if chunk_size is not None:
+            kwargs['chunk_size'] = chunk_size
+        return await self.session.validators.validate_many(
+            self, documents, stop_on_first=stop_on_first, executor=executor,
+            **kwargs)
+
     def has_rel(self, name):
         return bool(self.get_link(name))
 
     def expand_uri(self, name, context={}):
-        link = self.get_link(name)
-        if not link:
+        template = self.get_template(name)
+        if template is None:
             return None
-        href = link.get('href', '')
 
-        return uritemplate.expand(href, context)
+        return template.expand(context)
 
     def _init_href(self, href):
         (self.href, self.url, self.pointer) = self._split_href(href)
@@ -201,29 +238,279 @@ class Schema(UserDict):
 class LazySchema(Schema):
 
     def __init__(self, href, session=None):
+        if getattr(self, 'session', None) is not None:
+            # Returned from the session store: keep what was fetched
+            return
+
         self._init_href(href)
         self.session = session
         self._data = None
         self._raw_schema = None
+        self._reset_links()
+        self._subschemas = {}
 
     @property
     async def raw_schema(self):
         if self._raw_schema is None:
-            response = await self.session.request(self.url,
-                                                  **self.session.schema_args)
-            self._raw_schema = json.loads(response.body)
+            # Pointers share the document already loaded for their URL
+            root = self.session.store.get(self.url) if self.pointer else None
+            if root is not None and root is not self:
+                self._raw_schema = await root.raw_schema
+            else:
+                self._raw_schema = await self.session.schema_fetches.do(
+                    self.url, self._fetch_raw_schema)
         return self._raw_schema
 
+    async def _fetch_raw_schema(self):
+        return await self.session.load_raw_schema(
+            self.url, **self.session.schema_args)
+
     def __repr__(self):
         return repr({'$ref': self.href})
 
 
-def get_profile_from_header(headers):
-    if 'content-type' not in headers:
-        return None
-
-    full_content_type = 'content-type: {0}'.format(headers['content-type'])
-    header, parameters = parse_header(full_content_type)
+def _is_raw(value):
+    return (isinstance(value, (dict, list)) and
+            not isinstance(value, (Schema, _LazyDict, _LazyList)))
+
+
+def _lazy(value, schema):
+    if not _is_raw(value):
+        return value
+    if isinstance(value, dict):
+        return _LazyDict(value, schema)
+    return _LazyList(value, schema)
+
+
+# Views over the raw schema that replace $ref objects with Schema or
+# LazySchema instances when they are read, instead of walking and
+# rewriting the whole tree up front. The container itself always holds
+# the raw values, so dict(view), {**view} and copy() return the raw
+# schema whatever was read before; expanded values are kept aside. Writes
+# go through to the raw schema, which stays free of Schema instances for
+# the validators.
+class _LazyDict(dict):
+
+    def __init__(self, raw, schema):
+        dict.__init__(self, raw)
+        self._raw = raw
+        self._schema = schema
+        self._expanded = {}
+
+    def __getitem__(self, key):
+        if key in self._expanded:
+            return self._expanded[key]
+        value = dict.__getitem__(self, key)
+        expanded = self._schema.expand_ref(value)
+        if expanded is not value:
+            self._expanded[key] = expanded
+        return expanded
+
+    def __setitem__(self, key, value):
+        self._raw[key] = value
+        dict.__setitem__(self, key, value)
+        self._expanded.pop(key, None)
+
+    def __delitem__(self, key):
+        del self._raw[key]
+        dict.__delitem__(self, key)
+        self._expanded.pop(key, None)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(reversed(list(self)))
+        return key, self.pop(key)
+
+    def clear(self):
+        self._raw.clear()
+        dict.clear(self)
+        self._expanded.clear()
+
+    def copy(self):
+        return dict(self._raw)
+
+    def __eq__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+
+class _LazyList(list):
+
+    def __init__(self, raw, schema):
+        list.__init__(self, raw)
+        self._raw = raw
+        self._schema = schema
+        self._expanded = {}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if index in self._expanded:
+            return self._expanded[index]
+        value = list.__getitem__(self, index)
+        expanded = self._schema.expand_ref(value)
+        if expanded is not value:
+            self._expanded[index] = expanded
+        return expanded
+
+    def __setitem__(self, index, value):
+        self._raw[index] = value
+        list.__setitem__(self, index, value)
+        # Slices may shift the items after them
+        self._expanded.clear()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def _mutate(self, name, *args):
+        # Applies a list method to the raw schema and to the view
+        getattr(self._raw, name)(*args)
+        result = getattr(list, name)(self, *args)
+        self._expanded.clear()
+        return result
+
+    def __delitem__(self, index):
+        self._mutate('__delitem__', index)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def append(self, value):
+        self._mutate('append', value)
+
+    def extend(self, values):
+        self._mutate('extend', list(values))
+
+    def insert(self, index, value):
+        self._mutate('insert', index, value)
+
+    def pop(self, index=-1):
+        value = self[index]
+        self._mutate('pop', index)
+        return value
+
+    def remove(self, value):
+        self.pop(list(self).index(value))
+
+    def clear(self):
+        self._mutate('clear')
+
+    def reverse(self):
+        self._mutate('reverse')
+
+    def sort(self, *args, **kwargs):
+        raise TypeError('Schema views cannot be sorted in place')
+
+    def copy(self):
+        return list(self._raw)
+
+    def __eq__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) == other
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+
+def iter_external_refs(raw_schema):
+    stack = [raw_schema]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            ref = item.get('$ref')
+            if isinstance(ref, str) and Schema._split_href(ref)[1]:
+                yield ref
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def _split_parameters(value):
+    # Splits on semicolons outside quoted strings
+    parts = []
+    start = 0
+    quoted = escaped = False
+    for index, char in enumerate(value):
+        if escaped:
+            escaped = False
+        elif char == '\\' and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == ';' and not quoted:
+            parts.append(value[start:index])
+            start = index + 1
+    parts.append(value[start:])
+    return parts
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+        value = value.replace('\\\\', '\\').replace('\\"', '"')
+    return value
+
+
+def parse_content_type(value):
+    parts = _split_parameters(value)
+    parameters = {}
+    for part in parts[1:]:
+        name, equals, parameter = part.partition('=')
+        if not equals:
+            continue
+        parameters[name.strip().lower()] = _unquote(parameter.strip())
+    return parts[0].strip().lower(), parameters
+
+
+# Responses carry a handful of distinct content types, so the parsed
+# profile is memoized per header value
+@lru_cache(maxsize=256)
+def get_profile_from_content_type(value):
+    media_type, parameters = parse_content_type(value)
 
     if 'profile' not in parameters:
         return None
@@ -231,4 +518,11 @@ def get_profile_from_header(headers):
     if 'original-profile' in parameters:
         return parameters['original-profile']
 
-    return parameters.get('profile')
+    return parameters['profile']
+
+
+def get_profile_from_header(headers):
+    content_type = headers.get('content-type')
+    if content_type is None:
+        return None
+    return get_profile_from_content_type(content_type)
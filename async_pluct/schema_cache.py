@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from async_pluct.cache import conditional_headers
+
+
+class DiskSchemaEntry(object):
+
+    def __init__(self, url, schema, etag=None, last_modified=None,
+                 fetched_at=None):
+        self.url = url
+        self.schema = schema
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def age(self, now):
+        return max(0, now - (self.fetched_at or 0))
+
+    def conditional_headers(self):
+        return conditional_headers(self.etag, self.last_modified)
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at,
+            'schema': self.schema,
+        }
+
+
+class DiskSchemaCache(object):
+    # One JSON file per schema URL, so processes sharing the directory
+    # never see a partial write: files are written aside and renamed.
+
+    def __init__(self, directory, max_age=0, clock=time.time):
+        self.directory = directory
+        self.max_age = max_age
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.json')
+
+    def get(self, url):
+        try:
+            with open(self.path(url), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get('url') != url:
+            return None
+
+        return DiskSchemaEntry(
+            url, data.get('schema'), etag=data.get('etag'),
+            last_modified=data.get('last_modified'),
+            fetched_at=data.get('fetched_at'))
+
+    def set(self, url, schema, etag=None, last_modified=None):
+        entry = DiskSchemaEntry(
+            url, schema, etag=etag, last_modified=last_modified,
+            fetched_at=self.clock())
+
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry.to_dict(), f)
+            os.replace(temp_path, self.path(url))
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        return entry
+
+    def touch(self, entry):
+        return self.set(entry.url, entry.schema, etag=entry.etag,
+                        last_modified=entry.last_modified)
+
+    def needs_revalidation(self, entry):
+        return entry.age(self.clock()) >= self.max_age
+
+    def delete(self, url):
+        try:
+            os.unlink(self.path(url))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.unlink(os.path.join(self.directory, name))
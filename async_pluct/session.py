@@ -1,29 +1,164 @@
-import json
+import asyncio
+import time
 
-from async_pluct.http import http_client
+from collections import OrderedDict
+from functools import partial
+
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+
+from async_pluct.http import create_client, http_client, pool_stats
 from aiohttp import ClientResponse
 
-from async_pluct.resource import Resource
-from async_pluct.schema import Schema, LazySchema, get_profile_from_header
+from async_pluct.breaker import CircuitBreakers
+from async_pluct.cache import CachedResponse, HTTPCache, get_status
+from async_pluct.codec import get_codec
+from async_pluct.concurrency import (
+    SingleFlight, as_completed_bounded, gather_bounded)
+from async_pluct.hooks import (
+    CIRCUIT_STATE, PARSE, REQUEST_END, REQUEST_START, SCHEMA_FETCH, Hooks,
+    clock)
+from async_pluct.resource import Resource, ArrayResource
+from async_pluct.retry import HedgePolicy, RetryPolicy
+from async_pluct.schema import (
+    Schema, LazySchema, get_profile_from_header, iter_external_refs)
+from async_pluct.schema_cache import DiskSchemaCache
+from async_pluct.scheduler import NORMAL
+from async_pluct.store import SchemaStore
+from async_pluct.stream import JSONArrayParser
+from async_pluct.validation import ValidatorRegistry
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Documents with fewer JSON values are validated inline even when a
+# validation executor is configured
+VALIDATION_OFFLOAD_SIZE = 10000
+
+COALESCING_METHODS = ('GET', 'HEAD')
+COALESCING_ARGUMENTS = (
+    'method', 'headers', 'params', 'timeout', 'request_timeout', 'priority')
 
 
 class Session(object):
 
-    def __init__(self, client=None, timeout=None, schema_args={}):
+    def __init__(self, client=None, timeout=None, schema_args={}, cache=None,
+                 schema_store=None, concurrency=10, codec=None,
+                 transport=None, retry=None, hedge=None, compact=False,
+                 hooks=None, schema_cache=None, coalesce=False,
+                 breakers=None, scheduler=None, validation_executor=None,
+                 validation_offload_size=VALIDATION_OFFLOAD_SIZE):
         self.timeout = timeout
-        self.store = {}
+        self.compact = compact
         self.schema_args = schema_args
+        self.concurrency = concurrency
+        self._slots = None
+        self.codec = get_codec(codec)
 
-        if client is None:
-            self.client = http_client()
-        else:
+        if hooks is None:
+            hooks = Hooks()
+        self.hooks = hooks
+
+        if schema_store is None:
+            schema_store = SchemaStore()
+        self.store = schema_store
+
+        self.schema_fetches = SingleFlight()
+
+        self.coalesce = coalesce
+        self.resource_fetches = SingleFlight()
+
+        if isinstance(schema_cache, str):
+            schema_cache = DiskSchemaCache(schema_cache)
+        self.schema_cache = schema_cache
+        self._revalidations = {}
+        self._revalidated = set()
+        self.validators = ValidatorRegistry(self)
+        # Chained, so an on_evict given to the store keeps being called
+        self._store_on_evict = self.store.on_evict
+        self.store.on_evict = self._schema_evicted
+        self.validation_executor = validation_executor
+        self.validation_offload_size = validation_offload_size
+
+        if cache is True:
+            cache = HTTPCache()
+        self.cache = cache
+
+        if retry is True:
+            retry = RetryPolicy()
+        self.retry = retry
+
+        if hedge is True:
+            hedge = HedgePolicy()
+        self.hedge = hedge
+
+        if breakers is True:
+            breakers = CircuitBreakers()
+        self._breakers_on_change = None
+        if breakers is not None:
+            self._breakers_on_change = breakers.on_change
+            breakers.on_change = self._circuit_changed
+        self.breakers = breakers
+
+        self.scheduler = scheduler
+
+        self.transport = transport
+
+        if client is not None:
             self.client = client
+        elif transport is not None:
+            self.client = create_client(transport)
+        else:
+            self.client = http_client()
 
     async def close(self):
+        for task in list(self._revalidations.values()):
+            task.cancel()
         await self.client.close()
 
+    @property
+    def slots(self):
+        # Shared by every batch, so concurrent batches together stay within
+        # session.concurrency. Created lazily to bind to the running loop.
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def pool_stats(self):
+        return pool_stats(self.client)
+
+    def circuit_stats(self):
+        if self.breakers is None:
+            return {}
+        return self.breakers.stats()
+
+    def _schema_evicted(self, href):
+        self.validators.invalidate(href)
+        if self._store_on_evict is not None:
+            self._store_on_evict(href)
+
+    def _circuit_changed(self, host, previous, state):
+        if self.hooks:
+            self.hooks.emit(CIRCUIT_STATE, host=host, previous=previous,
+                            state=state)
+        if self._breakers_on_change is not None:
+            self._breakers_on_change(host, previous, state)
+
     async def resource(self, url, **kwargs):
-        response = await self.request(url, **kwargs)
+        key = None
+        if self.coalesce:
+            key = coalescing_key(url, kwargs)
+
+        if key is None:
+            response = await self.request(url, **kwargs)
+        else:
+            # Callers share the response, but each one parses its own
+            # data below, so resources never share mutable state
+            response = await self.resource_fetches.do(
+                key, partial(self.request, url, **kwargs))
+
         schema = None
 
         schema_url = get_profile_from_header(response.headers)
@@ -33,13 +168,175 @@ class Session(object):
         return Resource.from_response(
             response=response, session=self, schema=schema)
 
+    def _resource_factories(self, requests):
+        factories = []
+        for request in requests:
+            if isinstance(request, str):
+                url, kwargs = request, {}
+            else:
+                url, kwargs = request
+            factories.append(partial(self.resource, url, **kwargs))
+        return factories
+
+    async def resources(self, requests, concurrency=None):
+        return await gather_bounded(
+            self._resource_factories(requests), concurrency, self.slots)
+
+    def iter_resources(self, requests, concurrency=None):
+        return as_completed_bounded(
+            self._resource_factories(requests), concurrency, self.slots)
+
     async def schema(self, url, **kwargs):
-        response = await self.request(url, **kwargs)
-        data = json.loads(response.body)
+        data = await self.load_raw_schema(url, **kwargs)
         return Schema(url, raw_schema=data, session=self)
 
-    async def request(self, url, **kwargs):
+    async def preload(self, urls, concurrency=None):
+        # Fetches the schemas and, recursively, every external $ref they
+        # point to. Returns {url: LazySchema or exception}, in visit order.
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        results = OrderedDict()
+
+        def unvisited(hrefs, base=''):
+            for href in hrefs:
+                url = Schema._split_href(urljoin(base, href))[1]
+                if url not in results:
+                    results[url] = None
+                    yield url
+
+        async def visit(url):
+            async with semaphore:
+                schema = LazySchema(url, session=self)
+                try:
+                    raw_schema = await schema.raw_schema
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    results[url] = e
+                    return
+            results[url] = schema
 
+            await asyncio.gather(*[
+                visit(ref) for ref in unvisited(
+                    iter_external_refs(raw_schema), url)])
+
+        await asyncio.gather(*[visit(url) for url in unvisited(urls)])
+        return results
+
+    async def load_raw_schema(self, url, **kwargs):
+        if self.schema_cache is None:
+            return await self._download_schema(url, **kwargs)
+
+        entry = await self._in_executor(self.schema_cache.get, url)
+        if entry is None:
+            return await self._download_schema(url, **kwargs)
+
+        # Each URL is revalidated at most once per session, so a server
+        # that never answers 304 costs one extra request, not one per load
+        if (url not in self._revalidated and
+                self.schema_cache.needs_revalidation(entry)):
+            self._revalidated.add(url)
+            task = asyncio.ensure_future(
+                self._revalidate_schema(entry, **kwargs))
+            self._revalidations[url] = task
+            task.add_done_callback(
+                lambda _: self._revalidations.pop(url, None))
+        return entry.schema
+
+    async def _download_schema(self, url, **kwargs):
+        start = clock() if self.hooks else None
+        response = await self.request(url, **kwargs)
+        data = self.loads(response.body, url)
+        if self.hooks:
+            self.hooks.emit(SCHEMA_FETCH, url=url, duration=clock() - start)
+
+        if self.schema_cache is not None:
+            await self._in_executor(
+                self.schema_cache.set, url, data,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'))
+        return data
+
+    async def _revalidate_schema(self, entry, **kwargs):
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.update(entry.conditional_headers())
+        try:
+            response = await self.request(
+                entry.url, headers=headers, **kwargs)
+            if get_status(response) == 304:
+                await self._in_executor(self.schema_cache.touch, entry)
+                return
+            data = self.loads(response.body, entry.url)
+        except Exception:
+            return
+
+        await self._in_executor(
+            self.schema_cache.set, entry.url, data,
+            etag=response.headers.get('etag'),
+            last_modified=response.headers.get('last-modified'))
+        if data != entry.schema:
+            # Resources already built keep the schema they have; schemas
+            # created from now on load the new version
+            self.store.discard(entry.url)
+
+    async def _in_executor(self, function, *args, **kwargs):
+        # Keeps disk I/O of the schema cache off the event loop
+        return await asyncio.get_event_loop().run_in_executor(
+            None, partial(function, *args, **kwargs))
+
+    async def request_json(self, url, **kwargs):
+        response = await self.request(url, **kwargs)
+        return self.loads(response.body, url)
+
+    def loads(self, body, url=None):
+        if not self.hooks:
+            return self.codec.loads(body)
+
+        start = clock()
+        try:
+            return self.codec.loads(body)
+        finally:
+            self.hooks.emit(PARSE, url=url, size=len(body),
+                            duration=clock() - start)
+
+    async def stream_resource(self, url, chunk_size=STREAM_CHUNK_SIZE,
+                              **kwargs):
+        self._prepare_request(kwargs)
+        await self._schedule(url, kwargs)
+
+        if not hasattr(self.client, 'stream'):
+            response = await self._fetch(url, **kwargs)
+            async for item in self._stream_items(
+                    url, response, _iter_body(response.body)):
+                yield item
+            return
+
+        async with self.client.stream(url, **kwargs) as response:
+            response.raise_for_status()
+            chunks = response.content.iter_chunked(chunk_size)
+            async for item in self._stream_items(url, response, chunks):
+                yield item
+
+    async def _stream_items(self, url, response, chunks):
+        schema = None
+        schema_url = get_profile_from_header(response.headers)
+        if schema_url is not None:
+            schema = LazySchema(href=schema_url, session=self)
+
+        collection = ArrayResource(
+            url, schema=schema, session=self, response=response,
+            headers=response.headers)
+
+        parser = JSONArrayParser()
+        index = 0
+        async for chunk in chunks:
+            for data in parser.feed(chunk):
+                yield Resource.from_data(
+                    url, data=data, schema=collection.item_schema(index),
+                    session=self)
+                index += 1
+        parser.close()
+
+    def _prepare_request(self, kwargs):
         if self.timeout is not None:
             kwargs.setdefault('request_timeout', self.timeout)
 
@@ -52,9 +349,176 @@ class Session(object):
 
         kwargs.setdefault('method', 'GET')
 
-        response = await self.client.fetch(url, **kwargs)
+    async def request(self, url, **kwargs):
+        self._prepare_request(kwargs)
+
+        if self.hooks:
+            return await self._observed_request(url, **kwargs)
+
+        return await self._dispatch(url, **kwargs)
+
+    async def _observed_request(self, url, **kwargs):
+        method = kwargs['method']
+        self.hooks.emit(REQUEST_START, url=url, method=method)
+
+        start = clock()
+        response = error = None
+        try:
+            response = await self._dispatch(url, **kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.hooks.emit(
+                REQUEST_END, url=url, method=method,
+                status=get_status(response), duration=clock() - start,
+                cached=isinstance(response, CachedResponse), error=error)
+
+    async def _dispatch(self, url, **kwargs):
+        if self.cache is None:
+            return await self._send(url, **kwargs)
+
+        return await self._cached_fetch(url, **kwargs)
+
+    async def _cached_fetch(self, url, **kwargs):
+        method = kwargs['method']
+        headers = kwargs['headers']
+        params = kwargs.get('params')
+
+        entry = self.cache.lookup(method, url, headers, params)
+        if entry is not None:
+            if self.cache.is_fresh(entry, headers):
+                return entry.response
+            kwargs['headers'] = dict(headers, **entry.conditional_headers())
+
+        request_time = self.cache.clock()
+        response = await self._send(url, **kwargs)
+
+        if entry is not None and get_status(response) == 304:
+            return self.cache.revalidated(
+                url, entry, response, request_time, params)
+
+        self.cache.store(
+            method, url, headers, response, request_time, params)
+        return response
+
+    async def _send(self, url, **kwargs):
+        if self.retry is None:
+            return await self._attempt(url, **kwargs)
+
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(url, **kwargs)
+            except Exception as e:
+                if not self.retry.should_retry(kwargs['method'], attempt, e):
+                    raise
+                await asyncio.sleep(self.retry.backoff(attempt, e))
+                attempt += 1
+
+    async def _schedule(self, url, kwargs):
+        priority = kwargs.pop('priority', NORMAL)
+        if self.scheduler is not None:
+            await self.scheduler.acquire(url, priority)
+
+    async def _attempt(self, url, **kwargs):
+        if self.breakers is None:
+            await self._schedule(url, kwargs)
+            return await self._hedged_fetch(url, **kwargs)
+
+        # An open circuit rejects the request before it waits for, and
+        # spends, a rate limit token
+        breaker = self.breakers.for_url(url)
+        breaker.before_request()
+        try:
+            await self._schedule(url, kwargs)
+            response = await self._hedged_fetch(url, **kwargs)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            self.breakers.record_error(breaker, e)
+            raise
+
+        breaker.record_success()
+        return response
+
+    async def _hedged_fetch(self, url, **kwargs):
+        if self.hedge is None or not self.hedge.applies_to(kwargs['method']):
+            return await self._fetch(url, **kwargs)
+
+        start = time.monotonic()
+        delay = self.hedge.delay()
+
+        if delay is None:
+            response = await self._fetch(url, **kwargs)
+            self.hedge.record(time.monotonic() - start)
+            return response
+
+        tasks = [asyncio.ensure_future(self._fetch(url, **kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            # The duplicate spends a rate limit token of its own, and is
+            # not sent when the host has none to spare
+            if not done and (self.scheduler is None or
+                             self.scheduler.try_acquire(url)):
+                tasks.append(asyncio.ensure_future(self._fetch(url, **kwargs)))
+
+            response = (await _first_success(tasks)).result()
+            self.hedge.record(time.monotonic() - start)
+            return response
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch(self, url, **kwargs):
+        try:
+            response = await self.client.fetch(url, **kwargs)
+        except Exception as e:
+            # Tornado raises HTTPError for 304 responses
+            response = getattr(e, 'response', None)
+            if getattr(e, 'code', None) != 304 or response is None:
+                raise
 
         if isinstance(response, ClientResponse):
             response.raise_for_status()
 
         return response
+
+
+def coalescing_key(url, kwargs):
+    # Only bodiless safe requests are coalesced, keyed on everything that
+    # may change the response
+    method = kwargs.get('method', 'GET').upper()
+    if method not in COALESCING_METHODS:
+        return None
+
+    if any(name not in COALESCING_ARGUMENTS for name in kwargs):
+        return None
+
+    headers = tuple(sorted(
+        (name.lower(), str(value))
+        for name, value in (kwargs.get('headers') or {}).items()))
+    params = tuple(sorted(
+        (name, str(value))
+        for name, value in (kwargs.get('params') or {}).items()))
+    timeout = kwargs.get('timeout', kwargs.get('request_timeout'))
+    return (method, str(url), headers, params, timeout)
+
+
+async def _iter_body(body):
+    yield body
+
+
+async def _first_success(tasks):
+    # Returns the first task that succeeds, or the last one to fail
+    pending = set(tasks)
+    while True:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task
+        if not pending:
+            return task
@@ -0,0 +1,129 @@
+import time
+
+from collections import OrderedDict
+
+
+class _RootEntry(object):
+
+    __slots__ = ('schemas', 'expires_at')
+
+    def __init__(self, expires_at):
+        self.schemas = {}
+        self.expires_at = expires_at
+
+
+class SchemaStore(object):
+
+    def __init__(self, maxsize=None, ttl=None, clock=time.monotonic,
+                 on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.on_evict = on_evict
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._roots = OrderedDict()
+
+    @staticmethod
+    def root_of(href):
+        return href.split('#', 1)[0]
+
+    def _entry(self, root):
+        entry = self._roots.get(root)
+        if entry is None:
+            return None
+
+        if entry.expires_at is not None and entry.expires_at <= self.clock():
+            del self._roots[root]
+            self.expirations += 1
+            self._evicted(root)
+            return None
+
+        self._roots.move_to_end(root)
+        return entry
+
+    def get(self, href, default=None):
+        entry = self._entry(self.root_of(href))
+        if entry is not None and href in entry.schemas:
+            self.hits += 1
+            return entry.schemas[href]
+
+        self.misses += 1
+        return default
+
+    def set(self, href, schema, ttl=None):
+        root = self.root_of(href)
+        entry = self._entry(root)
+
+        if entry is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = None if ttl is None else self.clock() + ttl
+            entry = _RootEntry(expires_at)
+            self._roots[root] = entry
+            self._evict()
+
+        entry.schemas[href] = schema
+
+    def _evict(self):
+        while self.maxsize is not None and len(self._roots) > self.maxsize:
+            root, _ = self._roots.popitem(last=False)
+            self.evictions += 1
+            self._evicted(root)
+
+    def _evicted(self, href):
+        # Lets the owner drop state derived from the schema, such as
+        # compiled validators
+        if self.on_evict is not None:
+            self.on_evict(href)
+
+    def discard(self, href):
+        root = self.root_of(href)
+        if href == root:
+            if self._roots.pop(root, None) is not None:
+                self._evicted(root)
+            return
+
+        entry = self._roots.get(root)
+        if entry is not None and entry.schemas.pop(href, None) is not None:
+            self._evicted(href)
+
+    def clear(self):
+        roots = list(self._roots)
+        self._roots.clear()
+        for root in roots:
+            self._evicted(root)
+
+    def stats(self):
+        return {
+            'roots': len(self._roots),
+            'schemas': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def __contains__(self, href):
+        entry = self._entry(self.root_of(href))
+        return entry is not None and href in entry.schemas
+
+    def __getitem__(self, href):
+        entry = self._entry(self.root_of(href))
+        if entry is None or href not in entry.schemas:
+            raise KeyError(href)
+        return entry.schemas[href]
+
+    def __setitem__(self, href, schema):
+        self.set(href, schema)
+
+    def __delitem__(self, href):
+        if href not in self:
+            raise KeyError(href)
+        self.discard(href)
+
+    def __len__(self):
+        return sum(len(entry.schemas) for entry in self._roots.values())
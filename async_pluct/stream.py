@@ -0,0 +1,136 @@
+import codecs
+import json
+import re
+
+
+WHITESPACE = ' \t\n\r'
+
+START, FIRST_VALUE, VALUE, SEPARATOR, DONE = range(5)
+
+# What ends a number or literal, what matters inside a string and what
+# matters outside strings inside an array or object
+SCALAR_END = re.compile(r'[ \t\n\r,\]]')
+STRING_SPECIAL = re.compile(r'["\\]')
+STRUCTURAL = re.compile(r'["\[\]{}]')
+
+
+# Parses the items of a top level JSON array from chunks of bytes (or
+# text) as they arrive; every feed() returns the items completed so far.
+# Chunks of an unfinished item are kept aside and scanned once, from where
+# the previous chunk stopped, so large items are decoded a single time.
+class JSONArrayParser(object):
+
+    def __init__(self, encoding='utf-8'):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._state = START
+        self._item = None
+        self._scalar = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = self._text_decoder.decode(chunk)
+
+        pos = 0
+        items = []
+
+        while True:
+            if self._item is not None:
+                end = self._scan(chunk, pos)
+                if end is None:
+                    self._item.append(chunk[pos:])
+                    break
+                self._item.append(chunk[pos:end])
+                items.append(self._decode(''.join(self._item)))
+                self._item = None
+                self._state = SEPARATOR
+                pos = end
+
+            while pos < len(chunk) and chunk[pos] in WHITESPACE:
+                pos += 1
+            if pos == len(chunk):
+                break
+
+            char = chunk[pos]
+            if self._state == START:
+                if char != '[':
+                    raise ValueError('Expected a JSON array')
+                pos += 1
+                self._state = FIRST_VALUE
+            elif self._state == FIRST_VALUE and char == ']':
+                pos += 1
+                self._state = DONE
+            elif self._state in (FIRST_VALUE, VALUE):
+                self._item = []
+                self._scalar = char not in '{["'
+            elif self._state == SEPARATOR:
+                if char == ',':
+                    self._state = VALUE
+                elif char == ']':
+                    self._state = DONE
+                else:
+                    raise ValueError(
+                        'Unexpected {0!r} between array items'.format(char))
+                pos += 1
+            else:
+                raise ValueError('Extra data after the JSON array')
+
+        return items
+
+    def _scan(self, text, pos):
+        # Returns the offset just past the current item, or None when the
+        # item continues in the next chunk
+        if self._scalar:
+            # A number cut by the chunk boundary still decodes ("1" of
+            # "12"), so a scalar only ends at a delimiter
+            match = SCALAR_END.search(text, pos)
+            return match.start() if match else None
+
+        while True:
+            if self._escape:
+                if pos == len(text):
+                    return None
+                pos += 1
+                self._escape = False
+
+            if self._in_string:
+                match = STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == '\\':
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._depth == 0:
+                    return pos
+                continue
+
+            match = STRUCTURAL.search(text, pos)
+            if match is None:
+                return None
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+    def _decode(self, text):
+        item, end = self._decoder.raw_decode(text)
+        if end != len(text):
+            raise ValueError(
+                'Unexpected {0!r} in array item'.format(text[end]))
+        return item
+
+    def close(self):
+        self.feed(self._text_decoder.decode(b'', final=True))
+        if self._state != DONE:
+            raise ValueError('Incomplete JSON array')
@@ -0,0 +1,309 @@
+import asyncio
+import hashlib
+import json
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from jsonschema import RefResolutionError, RefResolver
+from jsonschema.validators import validator_for
+
+try:
+    from urllib.parse import urldefrag, urljoin
+except ImportError:
+    from urlparse import urldefrag, urljoin
+
+from async_pluct.concurrency import gather_bounded
+from async_pluct.schema import LazySchema, Schema, iter_external_refs
+
+
+# Compiled validators of a process pool worker, keyed by payload digest
+_worker_validators = {}
+WORKER_CACHE_SIZE = 64
+
+VALIDATION_CHUNK_SIZE = 256
+
+
+def unresolved_ref(url):
+    # External refs are fetched before validating, so reaching a handler
+    # means the document was not prefetched; never block the loop on it
+    raise RefResolutionError(
+        'Remote reference {0} was not prefetched'.format(url))
+
+
+def exceeds_size(data, limit):
+    # Counts JSON values, stopping as soon as the limit is reached, so
+    # small documents are cheap to check and large ones cost at most limit
+    count = 0
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        count += 1
+        if count >= limit:
+            return True
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return False
+
+
+def plain_schema(schema):
+    # Unwraps Schema objects into the raw document and a pointer into it
+    pointer = ''
+    while isinstance(schema, Schema):
+        pointer = schema.pointer + pointer
+        schema = schema._raw_schema
+    return schema, pointer
+
+
+async def resolve_plain_schema(schema):
+    # Like plain_schema, loading lazy schemas along the way; also returns
+    # the URL of the outermost schema that has one
+    pointer = ''
+    url = ''
+    while isinstance(schema, Schema):
+        pointer = schema.pointer + pointer
+        url = url or schema.url
+        schema = await schema.raw_schema
+    return schema, pointer, url
+
+
+def error_details(error):
+    return {'path': list(error.absolute_path), 'message': error.message}
+
+
+def collect_errors(validator, documents, stop_on_first=False):
+    results = []
+    for document in documents:
+        errors = [error_details(error)
+                  for error in validator.iter_errors(document)]
+        results.append(errors)
+        if errors and stop_on_first:
+            break
+    return results
+
+
+def thread_validator(validator):
+    # RefResolver keeps a scope stack, so each thread gets its own
+    resolver = validator.resolver
+    resolver = RefResolver(
+        resolver.resolution_scope, resolver.referrer, store=resolver.store,
+        handlers=resolver.handlers)
+    return type(validator)(validator.schema, resolver=resolver)
+
+
+def validate_in_thread(validator, data):
+    return thread_validator(validator).is_valid(data)
+
+
+def validate_many_in_thread(validator, documents, stop_on_first):
+    return collect_errors(thread_validator(validator), documents,
+                          stop_on_first)
+
+
+def worker_validator(key, payload):
+    validator = _worker_validators.get(key)
+    if validator is None:
+        base_uri, referrer, schema, store = pickle.loads(payload)
+        resolver = RefResolver(
+            base_uri, referrer, store=store,
+            handlers={'https': unresolved_ref, 'http': unresolved_ref})
+        validator = validator_for(referrer)(schema, resolver=resolver)
+
+        if len(_worker_validators) >= WORKER_CACHE_SIZE:
+            _worker_validators.clear()
+        _worker_validators[key] = validator
+    return validator
+
+
+def validate_in_process(key, payload, document):
+    return worker_validator(key, payload).is_valid(json.loads(document))
+
+
+def validate_many_in_process(key, payload, documents, stop_on_first):
+    return collect_errors(worker_validator(key, payload),
+                          json.loads(documents), stop_on_first)
+
+
+class ValidatorRegistry(object):
+
+    def __init__(self, session):
+        self.session = session
+        self._validators = {}
+        self._prefetched = {}
+        self._payloads = {}
+        self._resolved = {}
+
+    def handlers(self):
+        return {'https': unresolved_ref, 'http': unresolved_ref}
+
+    def compile(self, schema, url='', pointer=''):
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        resolver = RefResolver(
+            schema.get('id', '') or url, schema, handlers=self.handlers())
+        if pointer:
+            return cls({'$ref': '#' + pointer}, resolver=resolver)
+        return cls(schema, resolver=resolver)
+
+    def get(self, href, schema):
+        cached = self._validators.get(href)
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+
+        validator = self.compile(schema, url=href.split('#', 1)[0])
+        self._validators[href] = (schema, validator)
+        return validator
+
+    async def prepare(self, href, schema):
+        validator = self.get(href, schema)
+        if self._prefetched.get(href) is not validator:
+            await self.prefetch(validator.resolver, schema)
+            self._prefetched[href] = validator
+        return validator
+
+    async def prepare_resolved(self, schema):
+        # Validator for the subschema a Schema points to, in contrast to
+        # get/prepare, which validate against the raw schema as given
+        root, pointer, url = await resolve_plain_schema(schema)
+        href = '#'.join((url, pointer)) if pointer else url
+
+        cached = self._resolved.get(href)
+        if cached is not None and cached[0] is root:
+            return href, cached[1]
+
+        validator = self.compile(root, url=url, pointer=pointer)
+        await self.prefetch(validator.resolver, root)
+        self._resolved[href] = (root, validator)
+        return href, validator
+
+    async def validate_many(self, schema, documents, stop_on_first=False,
+                            executor=None, chunk_size=VALIDATION_CHUNK_SIZE):
+        href, validator = await self.prepare_resolved(schema)
+        if executor is None:
+            return collect_errors(validator, documents, stop_on_first)
+
+        loop = asyncio.get_event_loop()
+        futures = []
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start:start + chunk_size]
+            if isinstance(executor, ProcessPoolExecutor):
+                key, payload = self.payload(href, validator)
+                future = loop.run_in_executor(
+                    executor, validate_many_in_process, key, payload,
+                    self.session.codec.dumps(chunk), stop_on_first)
+            else:
+                future = loop.run_in_executor(
+                    executor, validate_many_in_thread, validator, chunk,
+                    stop_on_first)
+            futures.append(future)
+
+        results = []
+        try:
+            for future in futures:
+                chunk_results = await future
+                results.extend(chunk_results)
+                if stop_on_first and chunk_results and chunk_results[-1]:
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+        return results
+
+    async def prefetch(self, resolver, schema):
+        # Fetches every document the schema refers to, level by level,
+        # and seeds the resolver store so validation does no I/O
+        pending = self._missing_documents(
+            resolver, resolver.resolution_scope, schema)
+        while pending:
+            urls = sorted(pending)
+            documents = await gather_bounded(
+                [partial(self.fetch, url) for url in urls],
+                self.session.concurrency)
+
+            for document in documents:
+                if isinstance(document, Exception):
+                    raise document
+
+            for url, document in zip(urls, documents):
+                resolver.store[url] = document
+
+            pending = set()
+            for url, document in zip(urls, documents):
+                pending.update(
+                    self._missing_documents(resolver, url, document))
+
+    async def run(self, executor, href, validator, data):
+        loop = asyncio.get_event_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            key, payload = self.payload(href, validator)
+            return await loop.run_in_executor(
+                executor, validate_in_process, key, payload,
+                self.session.codec.dumps(data))
+
+        return await loop.run_in_executor(
+            executor, validate_in_thread, validator, data)
+
+    def payload(self, href, validator):
+        # Pickled once per compiled validator; workers compile it once
+        # and cache it by digest
+        cached = self._payloads.get(href)
+        if cached is not None and cached[0] is validator:
+            return cached[1:]
+
+        resolver = validator.resolver
+        referrer, pointer = plain_schema(resolver.referrer)
+        schema = validator.schema
+        if schema is resolver.referrer:
+            schema = {'$ref': '#' + pointer} if pointer else referrer
+
+        defaults = RefResolver('', {}).store
+        store = dict(
+            (url, document) for url, document in resolver.store.items()
+            if url not in defaults and url != resolver.base_uri)
+
+        payload = pickle.dumps(
+            (resolver.base_uri, referrer, schema, store),
+            pickle.HIGHEST_PROTOCOL)
+        key = hashlib.sha1(payload).hexdigest()
+        self._payloads[href] = (validator, key, payload)
+        return key, payload
+
+    async def fetch(self, url):
+        # Goes through the session store, so documents are shared with
+        # navigation and fetched once per session
+        return await LazySchema(url, session=self.session).raw_schema
+
+    def _missing_documents(self, resolver, base, document):
+        urls = set()
+        for ref in iter_external_refs(document):
+            url, _ = urldefrag(urljoin(base, ref))
+            if url and url not in resolver.store:
+                urls.add(url)
+        return urls
+
+    def invalidate(self, href):
+        # A root URL also drops the validators of the pointers beneath it
+        root = href.split('#', 1)[0]
+        for cache in (self._validators, self._prefetched, self._payloads,
+                      self._resolved):
+            if href != root:
+                cache.pop(href, None)
+                continue
+            for key in [key for key in cache
+                        if key.split('#', 1)[0] == root]:
+                del cache[key]
+
+    def clear(self):
+        self._validators.clear()
+        self._prefetched.clear()
+        self._payloads.clear()
+        self._resolved.clear()
+
+    def __contains__(self, href):
+        return href in self._validators
+
+    def __len__(self):
+        return len(self._validators)
@@ -0,0 +1,60 @@
+"""Decode/encode throughput of every installed JSON codec on resource
+and schema shaped payloads.
+
+    python -m benchmarks.bench_codec
+"""
+from async_pluct.codec import available_codecs, get_codec
+from benchmarks.utils import measure, report
+
+
+def make_collection(size=500):
+    return [{
+        'id': i,
+        'slug': 'item-%d' % i,
+        'title': 'Item number %d with a reasonably long title' % i,
+        'published': i % 2 == 0,
+        'score': i / 7.0,
+        'tags': ['tag-%d' % t for t in range(5)],
+        'author': {'id': i % 13, 'name': 'Autor %d' % i, 'email': None},
+        'links': {'self': '/items/%d' % i, 'comments': '/items/%d/c' % i},
+    } for i in range(size)]
+
+
+def make_schema(links=100):
+    return {
+        '$schema': 'http://json-schema.org/draft-04/hyper-schema#',
+        'type': 'object',
+        'properties': {
+            'prop-%d' % i: {'type': 'string', 'maxLength': i}
+            for i in range(links)
+        },
+        'links': [
+            {'rel': 'rel-%d' % i, 'href': '/items/{id}/rel-%d' % i,
+             'method': 'GET'}
+            for i in range(links)
+        ],
+    }
+
+
+PAYLOADS = [
+    ('collection of 500 items', make_collection()),
+    ('hyper-schema with 100 links', make_schema()),
+]
+
+
+def main():
+    codecs = [get_codec(name) for name in reversed(available_codecs())]
+    stdlib = get_codec('json')
+
+    for title, payload in PAYLOADS:
+        body = stdlib.dumps(payload).encode('utf-8')
+        report('loads: %s (%d bytes)' % (title, len(body)), [
+            (codec.name, measure(lambda: codec.loads(body)))
+            for codec in codecs])
+        report('dumps: %s' % title, [
+            (codec.name, measure(lambda: codec.dumps(payload)))
+            for codec in codecs])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""End-to-end navigation against an in-process stand-in API: resource
+GETs, hyper-schema link following, validation and cold schema loading,
+with request rate, latency percentiles and allocations per navigation
+step.
+
+    python -m benchmarks.bench_navigation [--items N] [--links N]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from async_pluct.schema import LazySchema
+from async_pluct.session import Session
+from benchmarks.server import start_server
+from benchmarks.utils import report_latency
+
+
+async def timed(coroutine_function, count, concurrency=1):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await coroutine_function()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(count)])
+    return latencies, time.perf_counter() - start
+
+
+async def allocations(coroutine_function, steps):
+    await coroutine_function()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for _ in range(steps):
+            await coroutine_function()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    count = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return count / steps, size / steps
+
+
+async def run(options):
+    server = await start_server(items=options.items, links=options.links)
+    session = Session()
+    url = str(server.make_url('/items/0'))
+    schema_url = str(server.make_url('/schemas/item'))
+
+    try:
+        async def get_resource():
+            await session.resource(url)
+
+        resource = await session.resource(url)
+        state = {'resource': resource}
+
+        async def follow_next():
+            await state['resource'].schema.resolve_data()
+            state['resource'] = await state['resource'].rel('next')
+
+        async def validate():
+            await resource.is_valid()
+
+        async def load_cold_schema():
+            # A new session has an empty store and no pooled connections
+            cold_session = Session()
+            try:
+                await LazySchema(schema_url, session=cold_session).raw_schema
+            finally:
+                await cold_session.close()
+
+        for title, function, concurrency in [
+                ('Session.resource, sequential', get_resource, 1),
+                ('Session.resource, concurrency %d' % options.concurrency,
+                 get_resource, options.concurrency),
+                ("Resource.rel('next'), sequential", follow_next, 1),
+                ('Resource.is_valid, sequential', validate, 1),
+                ('LazySchema.raw_schema, new session each', load_cold_schema,
+                 1)]:
+            latencies, elapsed = await timed(
+                function, options.requests, concurrency)
+            report_latency(title, latencies, elapsed)
+
+        print('Retained allocations per navigation step')
+        for name, function in [
+                ('Session.resource', get_resource),
+                ("Resource.rel('next')", follow_next),
+                ('Resource.is_valid', validate)]:
+            count, size = await allocations(function, options.steps)
+            print('  {0:<40} {1:>10,.0f} blocks {2:>12,.0f} bytes'.format(
+                name, count, size))
+    finally:
+        await session.close()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--links', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--steps', type=int, default=50)
+    options = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run(options))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Repeated deep nested access on a resource, the way templates read
+the same keys over and over.
+
+    python -m benchmarks.bench_resource_access
+"""
+import asyncio
+
+from async_pluct.resource import Resource
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from benchmarks.utils import measure, report
+
+
+RAW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'section': {
+            'type': 'object',
+            'properties': {
+                'items': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'author': {
+                                'type': 'object',
+                                'properties': {'name': {'type': 'string'}},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+DATA = {
+    'section': {
+        'items': [{'author': {'name': 'name %d' % i}} for i in range(50)],
+    },
+}
+
+
+def read_all(resource):
+    items = resource['section']['items']
+    for index in range(len(items)):
+        items[index]['author']['name']
+
+
+def main():
+    loop = asyncio.get_event_loop()
+    session = Session()
+    schema = Schema('http://example.com/schema', raw_schema=RAW_SCHEMA,
+                    session=session)
+
+    def first_access():
+        read_all(Resource.from_data('http://example.com/', data=DATA,
+                                    schema=schema, session=session))
+
+    resource = Resource.from_data('http://example.com/', data=DATA,
+                                  schema=schema, session=session)
+
+    def repeated_access():
+        read_all(resource)
+
+    def repeated_access_with_schema():
+        items = resource['section']['items']
+        for index in range(len(items)):
+            items[index]['author'].schema
+
+    report('Nested access over 50 items (4 levels deep)', [
+        ('new resource every pass', measure(first_access)),
+        ('same resource, cached children', measure(repeated_access)),
+        ('same resource, reading child schemas',
+         measure(repeated_access_with_schema)),
+    ])
+    loop.run_until_complete(session.close())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""First-access latency of Schema.has_rel on a large schema with deep
+definitions, comparing on-access $ref expansion with a full-tree walk.
+
+    python -m benchmarks.bench_schema_first_access
+"""
+import json
+
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from benchmarks.utils import measure, report
+
+
+DEFINITIONS = 500
+
+
+def make_raw_schema(definitions=DEFINITIONS):
+    return {
+        'type': 'object',
+        'properties': dict(
+            ('field%d' % i, {'$ref': '#/definitions/def%d' % i})
+            for i in range(definitions)),
+        'definitions': dict(
+            ('def%d' % i, {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string'},
+                    'next': {'$ref': '#/definitions/def%d' % (
+                        (i + 1) % definitions)},
+                    'tags': {'type': 'array', 'items': [
+                        {'$ref': '#/definitions/def%d' % (
+                            (i + 2) % definitions)},
+                        {'type': 'string'},
+                    ]},
+                },
+            }) for i in range(definitions)),
+        'links': [
+            {'rel': 'rel-%d' % i, 'href': '/items/{id}/rel-%d' % i}
+            for i in range(20)
+        ],
+    }
+
+
+def walk(item):
+    # Touches every node but stops at schemas, like the eager expansion
+    if isinstance(item, Schema):
+        return
+    if isinstance(item, dict):
+        for value in item.values():
+            walk(value)
+    elif isinstance(item, list):
+        for value in item:
+            walk(value)
+
+
+def main():
+    encoded = json.dumps(make_raw_schema())
+
+    def new_schema():
+        session = Session(client=object())
+        return Schema('http://example.com/schema',
+                      raw_schema=json.loads(encoded), session=session)
+
+    def lazy_has_rel():
+        new_schema().has_rel('rel-19')
+
+    def full_walk_has_rel():
+        schema = new_schema()
+        walk(schema.data)
+        schema.has_rel('rel-19')
+
+    report('First Schema.has_rel, %d definitions' % DEFINITIONS, [
+        ('full-tree $ref expansion', measure(full_walk_has_rel)),
+        ('on-access $ref expansion', measure(lazy_has_rel)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Schema.rel dispatch against schemas with many links, comparing the
+precomputed link index and compiled templates with a linear scan.
+
+    python -m benchmarks.bench_schema_rel
+"""
+import asyncio
+
+import uritemplate
+
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from benchmarks.utils import measure, measure_async, report
+
+
+LINKS = 200
+
+
+def make_schema(session, links=LINKS):
+    raw_schema = {
+        'links': [
+            {'rel': 'rel-%d' % i, 'href': '/items/{id}/rel-%d{?page}' % i}
+            for i in range(links)
+        ]
+    }
+    return Schema('http://example.com/schema', raw_schema=raw_schema,
+                  session=session)
+
+
+def linear_expand_uri(schema, name, context):
+    for link in schema.data.get('links', []):
+        if link.get('rel') == name:
+            href = link.get('href', '')
+            uritemplate.variables(href)
+            return uritemplate.expand(href, context)
+    return None
+
+
+def main():
+    loop = asyncio.get_event_loop()
+    session = Session()
+
+    async def resource(uri, **kwargs):
+        return uri
+    session.resource = resource
+
+    schema = make_schema(session)
+    name = 'rel-%d' % (LINKS - 1)
+    context = {'id': 1, 'page': 2}
+
+    report('Schema.expand_uri, last of %d links' % LINKS, [
+        ('linear scan + uritemplate.expand',
+         measure(lambda: linear_expand_uri(schema, name, context))),
+        ('link index + compiled template',
+         measure(lambda: schema.expand_uri(name, context))),
+    ])
+
+    report('Schema.has_rel, last of %d links' % LINKS, [
+        ('linear scan', measure(
+            lambda: any(link.get('rel') == name
+                        for link in schema.data['links']))),
+        ('link index', measure(lambda: schema.has_rel(name))),
+    ])
+
+    async def rel():
+        await schema.rel(name, params={'id': 1, 'page': 2},
+                         url='http://example.com/')
+
+    report('Schema.rel dispatch', [
+        ('link index + compiled template', measure_async(rel)),
+    ])
+    loop.run_until_complete(session.close())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Throughput, in items per second, of validating a collection item by
+item, each with its own resolver, against one batch
+ArrayResource.validate_items call, inline and chunked across thread and
+process pools.
+
+    python -m benchmarks.bench_validate_many
+"""
+import asyncio
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from jsonschema import RefResolver
+from jsonschema.validators import validator_for
+
+from async_pluct.resource import Resource
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from benchmarks.bench_validation import DATA, RAW_SCHEMA
+from benchmarks.utils import measure_async, report
+
+
+ITEMS = 2000
+WORKERS = 4
+
+
+def main():
+    loop = asyncio.get_event_loop()
+    session = Session()
+    raw_schema = {
+        '$schema': RAW_SCHEMA['$schema'],
+        'type': 'array',
+        'items': {'$ref': '#/definitions/item'},
+        'definitions': dict(
+            RAW_SCHEMA['definitions'],
+            item=dict((key, value) for key, value in RAW_SCHEMA.items()
+                      if key not in ('$schema', 'definitions'))),
+    }
+    schema = Schema('http://example.com/schema', raw_schema=raw_schema,
+                    session=session)
+    collection = Resource.from_data(
+        'http://example.com/items', data=[dict(DATA, id=i)
+                                          for i in range(ITEMS)],
+        schema=schema, session=session)
+
+    item_schema = {'$ref': '#/definitions/item'}
+
+    async def one_by_one():
+        for item in collection.data:
+            resolver = RefResolver.from_schema(raw_schema)
+            validator_for(raw_schema)(
+                item_schema, resolver=resolver).is_valid(item)
+
+    async def batch():
+        await collection.validate_items()
+
+    threads = ThreadPoolExecutor(WORKERS)
+    processes = ProcessPoolExecutor(WORKERS)
+
+    async def batch_threads():
+        await collection.validate_items(executor=threads, chunk_size=250)
+
+    async def batch_processes():
+        await collection.validate_items(executor=processes, chunk_size=250)
+
+    results = [
+        ('new validator per item', measure_async(one_by_one)),
+        ('validate_items inline', measure_async(batch)),
+        ('validate_items, %d threads' % WORKERS,
+         measure_async(batch_threads)),
+        ('validate_items, %d processes' % WORKERS,
+         measure_async(batch_processes)),
+    ]
+    report('Items validated per second, %d items (ops/s x %d)' % (
+        ITEMS, ITEMS), [(name, ops * ITEMS) for name, ops in results])
+
+    threads.shutdown()
+    processes.shutdown()
+    loop.run_until_complete(session.close())
+
+
+if __name__ == '__main__':
+    main()
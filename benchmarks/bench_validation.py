@@ -0,0 +1,63 @@
+"""Validations per second of Resource.is_valid with and without the
+compiled validator cache.
+
+    python -m benchmarks.bench_validation
+"""
+import asyncio
+
+from jsonschema import RefResolver, validate
+
+from async_pluct.resource import Resource
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from benchmarks.utils import measure_async, report
+
+
+RAW_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-04/schema#',
+    'type': 'object',
+    'required': ['id', 'name', 'tags'],
+    'properties': {
+        'id': {'type': 'integer'},
+        'name': {'type': 'string', 'maxLength': 100},
+        'tags': {'type': 'array', 'items': {'$ref': '#/definitions/tag'}},
+    },
+    'definitions': {
+        'tag': {
+            'type': 'object',
+            'properties': {'slug': {'type': 'string'}},
+        },
+    },
+}
+
+DATA = {
+    'id': 1,
+    'name': 'resource',
+    'tags': [{'slug': 'tag-%d' % i} for i in range(10)],
+}
+
+
+def main():
+    loop = asyncio.get_event_loop()
+    session = Session()
+    schema = Schema('http://example.com/schema', raw_schema=RAW_SCHEMA,
+                    session=session)
+    resource = Resource.from_data('http://example.com/resource', data=DATA,
+                                  schema=schema, session=session)
+
+    async def uncached():
+        resolver = RefResolver.from_schema(RAW_SCHEMA)
+        validate(DATA, RAW_SCHEMA, resolver=resolver)
+
+    async def cached():
+        await resource.is_valid()
+
+    report('Resource.is_valid', [
+        ('validate() with a new resolver', measure_async(uncached)),
+        ('compiled validator cache', measure_async(cached)),
+    ])
+    loop.run_until_complete(session.close())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""In-process stand-in API serving hyper-schemas and resources of a
+configurable size and link fan-out, for offline benchmarks."""
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+JSON = 'application/json; profile={0}'
+
+
+def collection_schema():
+    return {
+        '$schema': 'http://json-schema.org/draft-04/hyper-schema#',
+        'type': 'array',
+        'items': {'type': 'object'},
+        'links': [
+            {'rel': 'item', 'href': '/items/{id}'},
+        ],
+    }
+
+
+def item_schema(links):
+    return {
+        '$schema': 'http://json-schema.org/draft-04/hyper-schema#',
+        'type': 'object',
+        'required': ['id', 'title'],
+        'properties': {
+            'id': {'type': 'integer'},
+            'title': {'type': 'string'},
+            'next': {'type': 'integer'},
+            'tags': {'type': 'array', 'items': {'$ref': '#/definitions/tag'}},
+        },
+        'definitions': {
+            'tag': {'type': 'object', 'properties': {
+                'slug': {'type': 'string'}}},
+        },
+        'links': [
+            {'rel': 'self', 'href': '/items/{id}'},
+            {'rel': 'next', 'href': '/items/{next}'},
+        ] + [
+            {'rel': 'related-%d' % i, 'href': '/items/{id}/related/%d' % i}
+            for i in range(links)
+        ],
+    }
+
+
+def item(number, items):
+    return {
+        'id': number,
+        'title': 'Item %d' % number,
+        'next': (number + 1) % items,
+        'tags': [{'slug': 'tag-%d' % i} for i in range(5)],
+    }
+
+
+def make_app(items=100, links=10):
+    schemas = {
+        'collection': json.dumps(collection_schema()),
+        'item': json.dumps(item_schema(links)),
+    }
+    bodies = [json.dumps(item(number, items)) for number in range(items)]
+    collection = json.dumps([item(number, items) for number in range(items)])
+
+    def respond(request, body, schema):
+        profile = 'http://{0}/schemas/{1}'.format(request.host, schema)
+        return web.Response(
+            body=body.encode('utf-8'),
+            headers={'content-type': JSON.format(profile)})
+
+    async def get_schema(request):
+        return web.Response(body=schemas[request.match_info['name']].encode(
+            'utf-8'), content_type='application/json')
+
+    async def get_collection(request):
+        return respond(request, collection, 'collection')
+
+    async def get_item(request):
+        number = int(request.match_info['id']) % items
+        return respond(request, bodies[number], 'item')
+
+    app = web.Application()
+    app.router.add_get('/schemas/{name}', get_schema)
+    app.router.add_get('/items', get_collection)
+    app.router.add_get('/items/{id}', get_item)
+    app.router.add_get('/items/{id}/related/{rel}', get_item)
+    return app
+
+
+async def start_server(items=100, links=10):
+    server = TestServer(make_app(items=items, links=links))
+    # aiohttp 2.x doesn't default to the current loop
+    await server.start_server(loop=asyncio.get_event_loop())
+    return server
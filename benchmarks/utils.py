@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+
+def measure(func, duration=1.0):
+    """Call ``func`` repeatedly for ``duration`` seconds, return ops/sec."""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        func()
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+def measure_async(coroutine_function, duration=1.0, loop=None):
+    loop = loop or asyncio.get_event_loop()
+
+    async def run():
+        count = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        while True:
+            await coroutine_function()
+            count += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                return count / (now - start)
+
+    return loop.run_until_complete(run())
+
+
+def report(title, results):
+    print(title)
+    baseline = None
+    for name, ops in results:
+        if baseline is None:
+            baseline = ops
+        print('  {0:<40} {1:>14,.0f} ops/s  {2:>6.2f}x'.format(
+            name, ops, ops / baseline))
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    index = int(round((len(samples) - 1) * percent / 100.0))
+    return samples[index]
+
+
+def report_latency(title, latencies, elapsed):
+    print(title)
+    print('  {0:>10,.0f} req/s  p50 {1:>8.2f} ms  p99 {2:>8.2f} ms'.format(
+        len(latencies) / elapsed,
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000))
@@ -0,0 +1,104 @@
+from unittest import TestCase
+
+from aiohttp import ClientConnectionError
+from asynctest import Mock
+
+from async_pluct.breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreakers, CircuitOpenError)
+
+
+class StatusError(Exception):
+
+    def __init__(self, status):
+        super(StatusError, self).__init__(status)
+        self.status = status
+
+
+class CircuitBreakerTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.on_change = Mock()
+        self.breakers = CircuitBreakers(
+            failure_threshold=2, recovery_timeout=10,
+            clock=lambda: self.now, on_change=self.on_change)
+        self.breaker = self.breakers.for_url('http://a.com/x')
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.breaker.before_request()
+            self.breaker.record_failure()
+
+    def test_is_per_host(self):
+        self.assertIs(self.breakers.for_url('http://a.com/y'), self.breaker)
+        self.assertIsNot(self.breakers.for_url('http://b.com/x'),
+                         self.breaker)
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail()
+        self.breaker.record_success()
+        self.fail()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.on_change.assert_called_once_with('a.com', CLOSED, OPEN)
+
+    def test_fails_fast_while_open(self):
+        self.fail(2)
+        self.now += 4
+
+        with self.assertRaises(CircuitOpenError) as context:
+            self.breaker.before_request()
+
+        self.assertEqual(context.exception.host, 'a.com')
+        self.assertEqual(context.exception.retry_after, 6)
+        self.assertEqual(self.breaker.rejected, 1)
+
+    def test_half_open_allows_limited_trials(self):
+        self.fail(2)
+        self.now += 10
+
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_request()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+    def test_half_open_closes_on_success(self):
+        self.fail(2)
+        self.now += 10
+        self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_reopens_on_failure(self):
+        self.fail(2)
+        self.now += 10
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.times_opened, 2)
+
+    def test_release_frees_half_open_trial(self):
+        self.fail(2)
+        self.now += 10
+        self.breaker.before_request()
+        self.breaker.release()
+        self.breaker.before_request()
+
+    def test_classifies_failures(self):
+        self.assertTrue(self.breakers.is_failure(ClientConnectionError()))
+        self.assertTrue(self.breakers.is_failure(StatusError(503)))
+        self.assertTrue(self.breakers.is_failure(StatusError(599)))
+        self.assertFalse(self.breakers.is_failure(StatusError(404)))
+        self.assertFalse(self.breakers.is_failure(ValueError()))
+
+    def test_reports_stats(self):
+        self.fail(2)
+        stats = self.breakers.stats()['a.com']
+        self.assertEqual(stats['state'], OPEN)
+        self.assertEqual(stats['total_failures'], 2)
+        self.assertEqual(stats['retry_after'], 10)
+
+        self.breakers.reset()
+        self.assertEqual(self.breakers.state('http://a.com/'), CLOSED)
+        self.assertEqual(len(self.breakers), 0)
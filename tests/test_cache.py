@@ -0,0 +1,172 @@
+from unittest import TestCase
+
+from asynctest import Mock
+
+from async_pluct.cache import (
+    CachedResponse, HTTPCache, MemoryCacheStorage, parse_cache_control)
+
+
+DATE = 'Mon, 01 Jan 2018 00:00:00 GMT'
+NOW = 1514764800  # DATE as a timestamp
+
+
+def make_response(headers=None, status=200, body=b'{}', url='http://a.com/'):
+    response = Mock()
+    response.status = status
+    response.headers = headers or {}
+    response.body = body
+    response.request.url = url
+    return response
+
+
+class Clock(object):
+
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ParseCacheControlTestCase(TestCase):
+
+    def test_parses_directives(self):
+        directives = parse_cache_control('public, max-age=60, no-cache')
+        self.assertEqual(directives, {
+            'public': None, 'max-age': '60', 'no-cache': None})
+
+    def test_returns_empty_for_missing_header(self):
+        self.assertEqual(parse_cache_control(None), {})
+
+
+class MemoryCacheStorageTestCase(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        storage = MemoryCacheStorage(maxsize=2)
+        storage.set('a', 1)
+        storage.set('b', 2)
+        storage.get('a')
+        storage.set('c', 3)
+
+        self.assertEqual(storage.get('a'), 1)
+        self.assertIs(storage.get('b'), None)
+        self.assertEqual(storage.get('c'), 3)
+
+
+class HTTPCacheTestCase(TestCase):
+
+    URL = 'http://a.com/'
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = HTTPCache(clock=self.clock)
+
+    def store(self, headers, method='GET', request_headers=None, **kwargs):
+        response = make_response(headers, **kwargs)
+        return self.cache.store(
+            method, self.URL, request_headers or {}, response, self.clock())
+
+    def lookup(self, request_headers=None):
+        return self.cache.lookup('GET', self.URL, request_headers or {})
+
+    def test_stores_response_with_max_age(self):
+        self.store({'cache-control': 'max-age=60', 'date': DATE})
+        entry = self.lookup()
+        self.assertIsInstance(entry.response, CachedResponse)
+        self.assertTrue(self.cache.is_fresh(entry, {}))
+
+    def test_entry_becomes_stale_after_max_age(self):
+        self.store({'cache-control': 'max-age=60', 'date': DATE})
+        self.clock.now += 61
+        self.assertFalse(self.cache.is_fresh(self.lookup(), {}))
+
+    def test_age_header_reduces_freshness(self):
+        self.store({'cache-control': 'max-age=60', 'age': '50'})
+        self.clock.now += 11
+        self.assertFalse(self.cache.is_fresh(self.lookup(), {}))
+
+    def test_uses_expires_header(self):
+        self.store({
+            'date': DATE, 'expires': 'Mon, 01 Jan 2018 00:01:00 GMT'})
+        self.clock.now += 30
+        self.assertTrue(self.cache.is_fresh(self.lookup(), {}))
+
+    def test_uses_heuristic_freshness_from_last_modified(self):
+        self.store({
+            'date': DATE, 'last-modified': 'Sun, 31 Dec 2017 23:00:00 GMT'})
+        entry = self.lookup()
+        self.assertEqual(entry.freshness_lifetime(), 360)
+
+    def test_does_not_store_without_freshness_or_validator(self):
+        self.assertIs(self.store({}), None)
+        self.assertIs(self.lookup(), None)
+
+    def test_stores_stale_response_with_validator(self):
+        self.store({'etag': '"v1"', 'cache-control': 'no-cache'})
+        entry = self.lookup()
+        self.assertFalse(self.cache.is_fresh(entry, {}))
+        self.assertEqual(
+            entry.conditional_headers(), {'If-None-Match': '"v1"'})
+
+    def test_does_not_store_no_store_response(self):
+        self.assertIs(self.store({'cache-control': 'no-store'}), None)
+
+    def test_does_not_store_error_status(self):
+        self.assertIs(
+            self.store({'cache-control': 'max-age=60'}, status=500), None)
+
+    def test_does_not_store_non_get_requests(self):
+        self.store({'cache-control': 'max-age=60'}, method='POST')
+        self.assertIs(self.lookup(), None)
+
+    def test_unsafe_methods_invalidate_entry(self):
+        self.store({'cache-control': 'max-age=60'})
+        self.store({}, method='DELETE')
+        self.assertIs(self.lookup(), None)
+
+    def test_request_no_cache_forces_revalidation(self):
+        self.store({'cache-control': 'max-age=60'})
+        self.assertFalse(
+            self.cache.is_fresh(self.lookup(), {'Cache-Control': 'no-cache'}))
+
+    def test_matches_vary_headers(self):
+        self.store({'cache-control': 'max-age=60', 'vary': 'Accept'},
+                   request_headers={'accept': 'application/json'})
+        self.assertIsNot(self.lookup({'Accept': 'application/json'}), None)
+        self.assertIs(self.lookup({'Accept': 'text/html'}), None)
+
+    def test_revalidation_updates_headers(self):
+        self.store({'cache-control': 'max-age=0', 'etag': '"v1"'})
+        entry = self.lookup()
+        not_modified = make_response(
+            {'cache-control': 'max-age=60', 'etag': '"v1"'}, status=304)
+
+        response = self.cache.revalidated(
+            self.URL, entry, not_modified, self.clock())
+
+        self.assertEqual(response.body, b'{}')
+        self.assertEqual(response.headers['Cache-Control'], 'max-age=60')
+        self.assertTrue(self.cache.is_fresh(self.lookup(), {}))
+
+    def test_keys_entries_by_query_params(self):
+        response = make_response({'cache-control': 'max-age=60'})
+        self.cache.store('GET', self.URL, {}, response, self.clock(),
+                         params={'page': 2})
+
+        self.assertIs(self.lookup(), None)
+        self.assertIsNot(
+            self.cache.lookup('GET', self.URL, {}, params={'page': '2'}),
+            None)
+        self.assertIs(
+            self.cache.lookup('GET', self.URL, {}, params={'page': 3}),
+            None)
+
+    def test_key_sorts_and_encodes_params(self):
+        self.assertEqual(
+            self.cache.key('http://a.com/?x=1', {'b': 'a b', 'a': 1}),
+            'http://a.com/?x=1&a=1&b=a+b')
+        self.assertEqual(self.cache.key(self.URL, {}), self.URL)
+
+    def test_cached_response_keeps_request_url(self):
+        self.store({'cache-control': 'max-age=60'}, url='http://b.com/')
+        self.assertEqual(self.lookup().response.request.url, 'http://b.com/')
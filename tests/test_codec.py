@@ -0,0 +1,67 @@
+from unittest import TestCase, skipUnless
+
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+from aiohttp import web
+
+from async_pluct.codec import (
+    CODECS, JSONCodec, available_codecs, get_codec)
+from async_pluct.session import Session
+
+
+DATA = {'name': 'café', 'items': [1, 2.5, None, True, {'id': 'x'}]}
+
+
+class GetCodecTestCase(TestCase):
+
+    def test_uses_stdlib_by_default(self):
+        self.assertIsInstance(get_codec(), JSONCodec)
+        self.assertEqual(get_codec().name, 'json')
+
+    def test_picks_fastest_available_codec_on_auto(self):
+        self.assertEqual(get_codec('auto').name, available_codecs()[0])
+
+    def test_accepts_codec_instances(self):
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+
+    def test_rejects_unknown_codecs(self):
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_stdlib_is_always_available(self):
+        self.assertIn('json', available_codecs())
+
+
+class CodecsTestCase(TestCase):
+
+    def test_codecs_roundtrip_bytes(self):
+        for name in available_codecs():
+            codec = get_codec(name)
+            encoded = codec.dumps(DATA)
+            if isinstance(encoded, str):
+                encoded = encoded.encode('utf-8')
+            self.assertEqual(codec.loads(encoded), DATA, name)
+
+    def test_codecs_raise_value_error_on_invalid_json(self):
+        for name in available_codecs():
+            with self.assertRaises(ValueError):
+                get_codec(name).loads(b'{-}')
+
+    @skipUnless(CODECS['orjson'].module, 'orjson is not installed')
+    def test_orjson_encodes_to_bytes(self):
+        self.assertIsInstance(get_codec('orjson').dumps(DATA), bytes)
+
+
+class SessionCodecTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    @unittest_run_loop
+    async def test_uses_stdlib_by_default(self):
+        self.assertEqual(Session().codec.name, 'json')
+
+    @unittest_run_loop
+    async def test_accepts_codec_name(self):
+        session = Session(codec='auto')
+        self.assertEqual(session.codec.name, available_codecs()[0])
@@ -0,0 +1,124 @@
+import asyncio
+
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+from aiohttp import web
+
+from async_pluct.concurrency import (
+    SingleFlight, as_completed_bounded, gather_bounded)
+
+
+class SingleFlightTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    async def slow_call(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+    async def failing_call(self):
+        self.calls += 1
+        raise ValueError('boom')
+
+    @unittest_run_loop
+    async def test_shares_result_between_concurrent_calls(self):
+        results = await asyncio.gather(
+            self.flight.do('key', self.slow_call),
+            self.flight.do('key', self.slow_call))
+        self.assertEqual(results, [1, 1])
+        self.assertEqual(self.calls, 1)
+
+    @unittest_run_loop
+    async def test_runs_again_after_completion(self):
+        await self.flight.do('key', self.slow_call)
+        result = await self.flight.do('key', self.slow_call)
+        self.assertEqual(result, 2)
+        self.assertNotIn('key', self.flight)
+
+    @unittest_run_loop
+    async def test_keeps_different_keys_apart(self):
+        await asyncio.gather(
+            self.flight.do('a', self.slow_call),
+            self.flight.do('b', self.slow_call))
+        self.assertEqual(self.calls, 2)
+
+    @unittest_run_loop
+    async def test_forgets_failures(self):
+        with self.assertRaises(ValueError):
+            await self.flight.do('key', self.failing_call)
+        self.assertEqual(len(self.flight), 0)
+
+    @unittest_run_loop
+    async def test_cancelling_a_waiter_keeps_the_call_running(self):
+        cancelled = asyncio.ensure_future(
+            self.flight.do('key', self.slow_call))
+        waiter = asyncio.ensure_future(self.flight.do('key', self.slow_call))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        self.assertEqual(await waiter, 1)
+
+
+class BoundedTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.running = 0
+        self.max_running = 0
+
+    def factory(self, result, delay=0.01):
+        async def call():
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(delay)
+            self.running -= 1
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return call
+
+    @unittest_run_loop
+    async def test_gather_keeps_order(self):
+        results = await gather_bounded([
+            self.factory('slow', 0.02), self.factory('fast', 0)])
+        self.assertEqual(results, ['slow', 'fast'])
+
+    @unittest_run_loop
+    async def test_gather_limits_concurrency(self):
+        await gather_bounded([self.factory(i) for i in range(6)], limit=2)
+        self.assertEqual(self.max_running, 2)
+
+    @unittest_run_loop
+    async def test_gather_shares_semaphore_between_calls(self):
+        shared = asyncio.Semaphore(3)
+        await asyncio.gather(
+            gather_bounded([self.factory(i) for i in range(6)], 2, shared),
+            gather_bounded([self.factory(i) for i in range(6)], 2, shared))
+        self.assertEqual(self.max_running, 3)
+
+    @unittest_run_loop
+    async def test_gather_returns_errors_per_item(self):
+        error = ValueError('boom')
+        results = await gather_bounded([
+            self.factory(1), self.factory(error), self.factory(3)])
+        self.assertEqual(results, [1, error, 3])
+
+    @unittest_run_loop
+    async def test_as_completed_yields_indexes_in_completion_order(self):
+        results = [item async for item in as_completed_bounded([
+            self.factory('slow', 0.02), self.factory('fast', 0)])]
+        self.assertEqual(results, [(1, 'fast'), (0, 'slow')])
+
+    @unittest_run_loop
+    async def test_as_completed_limits_concurrency(self):
+        results = [item async for item in as_completed_bounded(
+            [self.factory(i) for i in range(6)], limit=3)]
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.max_running, 3)
@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from asynctest import Mock
+
+from async_pluct.hooks import (
+    PARSE, REQUEST_END, Histogram, Hooks, MetricsCollector)
+
+
+class HooksTestCase(TestCase):
+
+    def setUp(self):
+        self.hooks = Hooks()
+
+    def test_is_falsy_without_listeners(self):
+        self.assertFalse(self.hooks)
+
+        listener = self.hooks.on(PARSE, Mock())
+        self.assertTrue(self.hooks)
+        self.assertIn(PARSE, self.hooks)
+
+        self.hooks.off(PARSE, listener)
+        self.assertFalse(self.hooks)
+
+    def test_emits_to_listeners_of_the_event(self):
+        parse = self.hooks.on(PARSE, Mock())
+        request_end = self.hooks.on(REQUEST_END, Mock())
+
+        self.hooks.emit(PARSE, url='/', duration=0.5)
+
+        parse.assert_called_once_with(PARSE, url='/', duration=0.5)
+        self.assertFalse(request_end.called)
+
+    def test_rejects_unknown_events(self):
+        with self.assertRaises(ValueError):
+            self.hooks.on('unknown', Mock())
+
+
+class HistogramTestCase(TestCase):
+
+    def test_summarizes_observations(self):
+        histogram = Histogram(buckets=(1, 2, 5))
+        for value in (0.5, 1.5, 1.5, 4, 8):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['sum'], 15.5)
+        self.assertEqual(snapshot['min'], 0.5)
+        self.assertEqual(snapshot['max'], 8)
+        self.assertEqual(snapshot['mean'], 3.1)
+        self.assertEqual(snapshot['p50'], 2)
+        self.assertEqual(snapshot['p99'], 8)
+
+    def test_empty_histogram(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(50))
+
+
+class MetricsCollectorTestCase(TestCase):
+
+    def setUp(self):
+        self.hooks = Hooks()
+        self.metrics = MetricsCollector().attach(self.hooks)
+
+    def test_counts_events_and_records_durations(self):
+        self.hooks.emit(PARSE, url='/', size=2, duration=0.01)
+        self.hooks.emit(PARSE, url='/', size=2, duration=0.03)
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {PARSE: 2})
+        self.assertEqual(snapshot['histograms'][PARSE]['count'], 2)
+        self.assertAlmostEqual(snapshot['histograms'][PARSE]['sum'], 0.04)
+
+    def test_counts_errors(self):
+        self.hooks.emit(REQUEST_END, url='/', duration=0.1,
+                        error=ValueError())
+        self.assertEqual(self.metrics.counters[REQUEST_END + '_error'], 1)
+
+    def test_detach_and_reset(self):
+        self.hooks.emit(PARSE, duration=0.1)
+        self.metrics.detach(self.hooks)
+        self.metrics.reset()
+
+        self.assertFalse(self.hooks)
+        self.assertEqual(self.metrics.snapshot(),
+                         {'counters': {}, 'histograms': {}})
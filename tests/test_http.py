@@ -4,7 +4,8 @@ from aiohttp import web
 from asynctest import patch, CoroutineMock
 from asyncio import Future
 
-from async_pluct.http import http_client
+from async_pluct.http import (
+    TransportConfig, create_client, http_client, pool_stats)
 
 
 async def hello_get_handler(request):
@@ -76,3 +77,41 @@ class BaseTestCase(AioHTTPTestCase):
         result = await self.my_client.fetch(url, **args)
         request_mock.assert_called_with('get', url, headers={'X-Request-ID': 20})
         self.assertEqual(result.body, b'mock content')
+
+
+class TransportTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        app = web.Application()
+        app.router.add_get('/', hello_get_handler)
+        return app
+
+    async def setUpAsync(self):
+        self.transport = TransportConfig(
+            limit=20, limit_per_host=5, keepalive_timeout=30,
+            ttl_dns_cache=60)
+        self.my_client = create_client(self.transport)
+
+    async def tearDownAsync(self):
+        await self.my_client.close()
+
+    @unittest_run_loop
+    async def test_creates_client_with_transport_settings(self):
+        connector = self.my_client.connector
+        self.assertIsInstance(self.my_client, http_client)
+        self.assertEqual(connector.limit, 20)
+        self.assertEqual(connector.limit_per_host, 5)
+        self.assertEqual(connector._keepalive_timeout, 30)
+        self.assertTrue(connector.use_dns_cache)
+
+    @unittest_run_loop
+    async def test_reports_idle_connections(self):
+        await self.my_client.fetch(self.server.make_url('/'))
+        stats = pool_stats(self.my_client)
+        self.assertEqual(stats, {
+            'limit': 20,
+            'limit_per_host': 5,
+            'in_use': 0,
+            'idle': 1,
+            'waiting': 0,
+        })
@@ -1,14 +1,22 @@
 import json
+import tracemalloc
+import weakref
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
 from aiohttp import web
 
-from jsonschema import RefResolver
-from asynctest import patch, Mock
+from jsonschema import RefResolutionError, RefResolver
+from asynctest import patch, Mock, CoroutineMock, ANY
 
-from async_pluct.resource import Resource, ObjectResource, ArrayResource
+from async_pluct.resource import (
+    Resource, ObjectResource, ArrayResource, CompactObjectResource,
+    CompactArrayResource)
 from async_pluct.session import Session
 from async_pluct.schema import Schema
+from async_pluct.validation import (
+    exceeds_size, plain_schema, unresolved_ref)
 
 
 class BaseTestCase(AioHTTPTestCase):
@@ -121,6 +129,13 @@ class ResourceTestCase(BaseTestCase):
     async def test_is_valid(self):
         self.assertTrue(await self.result.is_valid())
 
+    @unittest_run_loop
+    async def test_is_valid_emits_validation_duration(self):
+        listener = self.session.hooks.on('validation', Mock())
+        await self.result.is_valid()
+        listener.assert_called_once_with(
+            'validation', href=self.schema.href, valid=True, duration=ANY)
+
     def test_resolve_pointer(self):
         self.assertEqual(self.result.resolve_pointer("/name"), "repos")
 
@@ -130,18 +145,43 @@ class ResourceTestCase(BaseTestCase):
     def test_resource_should_be_instance_of_schema(self):
         self.assertIsInstance(self.result, Resource)
 
-    @patch('async_pluct.resources.validate')
     @unittest_run_loop
-    async def test_is_valid_call_validate_with_resolver_instance(self, mock_validate):
+    async def test_is_valid_builds_validator_with_resolver_instance(self):
+        await self.result.is_valid()
+
+        validator = self.session.validators.get(
+            self.schema.href, self.raw_schema)
+        self.assertIsInstance(validator.resolver, RefResolver)
+
+        http_handler, https_handler = list(
+            validator.resolver.handlers.values())
+        self.assertIs(http_handler, unresolved_ref)
+        self.assertIs(https_handler, unresolved_ref)
+
+        with self.assertRaises(RefResolutionError):
+            http_handler('http://example.com/schema')
+
+    @patch('async_pluct.validation.validator_for')
+    @unittest_run_loop
+    async def test_is_valid_reuses_compiled_validator(self, validator_for):
         await self.result.is_valid()
-        self.assertTrue(mock_validate.called)
+        await self.result.is_valid()
+        await self.resource_from_data(
+            '/other', data=self.data, schema=self.schema).is_valid()
+
+        self.assertEqual(validator_for.call_count, 1)
+        self.assertEqual(
+            validator_for.return_value.check_schema.call_count, 1)
 
-        resolver = mock_validate.call_args[-1]['resolver']
-        self.assertIsInstance(resolver, RefResolver)
+    @unittest_run_loop
+    async def test_is_valid_recompiles_for_new_raw_schema(self):
+        self.assertTrue(await self.result.is_valid())
 
-        http_handler, https_handler = list(resolver.handlers.values())
-        self.assertEqual(http_handler, self.result.session_request_json)
-        self.assertEqual(https_handler, self.result.session_request_json)
+        schema = Schema(
+            href="url.com", raw_schema=dict(self.raw_schema, required=['x']),
+            session=self.session)
+        self.assertFalse(await self.result.is_valid())
+        self.assertIs(self.result.schema, schema)
 
     @unittest_run_loop
     async def test_session_request_json(self):
@@ -155,6 +195,244 @@ class ResourceTestCase(BaseTestCase):
             self.assertEqual(result, {'fake': 'json'})
 
 
+class ResourceRemoteRefValidationTestCase(BaseTestCase):
+
+    DOCUMENTS = {
+        'http://a.com/person': {
+            'type': 'object',
+            'properties': {'address': {'$ref': 'address#/definitions/a'}},
+        },
+        'http://a.com/address': {
+            'definitions': {'a': {'type': 'string'}},
+        },
+        'http://a.com/tag': {'type': 'string'},
+    }
+
+    async def setUpAsync(self):
+        await super().setUpAsync()
+        self.raw_schema = {
+            'type': 'object',
+            'properties': {
+                'author': {'$ref': 'http://a.com/person'},
+                'tags': {'items': {'$ref': 'http://a.com/tag#'}},
+            },
+        }
+        self.schema = Schema('http://a.com/article',
+                             raw_schema=self.raw_schema, session=self.session)
+        self.fetched = []
+        self.request_patcher = patch.object(
+            self.session, 'request', side_effect=self.request)
+        self.request_patcher.start()
+
+    async def tearDownAsync(self):
+        self.request_patcher.stop()
+
+    async def request(self, url, **kwargs):
+        self.fetched.append(url)
+        return Mock(headers={},
+                    body=json.dumps(self.DOCUMENTS[url]).encode('utf-8'))
+
+    def article(self, address):
+        return self.resource_from_data(
+            '/article', schema=self.schema,
+            data={'author': {'address': address}, 'tags': ['a']})
+
+    @unittest_run_loop
+    async def test_prefetches_remote_refs_before_validating(self):
+        self.assertTrue(await self.article('street').is_valid())
+        self.assertFalse(await self.article(1).is_valid())
+
+        self.assertEqual(sorted(self.fetched), sorted(self.DOCUMENTS))
+
+    @unittest_run_loop
+    async def test_seeds_resolver_store(self):
+        await self.article('street').is_valid()
+
+        validator = self.session.validators.get(
+            self.schema.href, self.raw_schema)
+        for url, document in self.DOCUMENTS.items():
+            self.assertEqual(validator.resolver.store[url], document)
+
+    @unittest_run_loop
+    async def test_fetches_each_document_once(self):
+        await self.article('street').is_valid()
+        await self.article('avenue').is_valid()
+        await self.schema.session.validators.prefetch(
+            RefResolver('', {}), self.raw_schema)
+
+        self.assertEqual(len(self.fetched), len(self.DOCUMENTS))
+
+
+class ResourceValidationExecutorTestCase(BaseTestCase):
+
+    async def setUpAsync(self):
+        await super().setUpAsync()
+        self.raw_schema = {
+            'type': 'object',
+            'properties': {
+                'items': {
+                    'type': 'array',
+                    'items': {'$ref': '#/definitions/item'},
+                },
+            },
+            'definitions': {'item': {'type': 'integer'}},
+        }
+        self.schema = Schema('http://a.com/schema',
+                             raw_schema=self.raw_schema, session=self.session)
+        self.session.validation_offload_size = 10
+
+    def resource(self, items):
+        return self.resource_from_data(
+            '/list', data={'items': items}, schema=self.schema)
+
+    @unittest_run_loop
+    async def test_validates_small_documents_inline(self):
+        self.session.validation_executor = ThreadPoolExecutor(1)
+        with patch.object(self.session.validators, 'run',
+                          CoroutineMock()) as run:
+            self.assertTrue(await self.resource([1, 2]).is_valid())
+            self.assertFalse(run.called)
+
+    @unittest_run_loop
+    async def test_offloads_large_documents_to_session_executor(self):
+        executor = self.session.validation_executor = ThreadPoolExecutor(1)
+        with patch.object(self.session.validators, 'run',
+                          CoroutineMock(return_value=True)) as run:
+            self.assertTrue(await self.resource(list(range(20))).is_valid())
+            run.assert_called_once_with(
+                executor, self.schema.href, ANY, ANY)
+
+    @unittest_run_loop
+    async def test_validates_in_thread_pool(self):
+        with ThreadPoolExecutor(2) as executor:
+            self.assertTrue(
+                await self.resource(list(range(20))).is_valid(executor))
+            self.assertFalse(
+                await self.resource(list(range(19)) + ['x']).is_valid(
+                    executor))
+
+    @unittest_run_loop
+    async def test_validates_in_process_pool(self):
+        with ProcessPoolExecutor(1) as executor:
+            self.assertTrue(
+                await self.resource(list(range(20))).is_valid(executor))
+            self.assertFalse(
+                await self.resource(list(range(19)) + ['x']).is_valid(
+                    executor))
+
+    @unittest_run_loop
+    async def test_pickles_payload_once_per_validator(self):
+        validator = await self.session.validators.prepare(
+            self.schema.href, self.raw_schema)
+        key, payload = self.session.validators.payload(
+            self.schema.href, validator)
+        self.assertEqual(
+            self.session.validators.payload(self.schema.href, validator),
+            (key, payload))
+
+    def test_unwraps_item_schemas(self):
+        item = Schema('#/properties/items', raw_schema=self.schema,
+                      session=self.session)
+        self.assertEqual(plain_schema(item),
+                         (self.raw_schema, '/properties/items'))
+
+    def test_exceeds_size(self):
+        self.assertFalse(exceeds_size({'a': [1, 2]}, 5))
+        self.assertTrue(exceeds_size({'a': [1, 2, 3, 4]}, 5))
+
+
+class ValidateManyTestCase(BaseTestCase):
+
+    async def setUpAsync(self):
+        await super().setUpAsync()
+        self.raw_schema = {
+            'type': 'array',
+            'items': {'$ref': '#/definitions/item'},
+            'definitions': {
+                'item': {
+                    'type': 'object',
+                    'required': ['id'],
+                    'properties': {'id': {'type': 'integer'}},
+                },
+            },
+        }
+        self.schema = Schema('http://a.com/list',
+                             raw_schema=self.raw_schema, session=self.session)
+        self.items = [{'id': 1}, {'id': 'x'}, {}, {'id': 4}]
+        self.expected = [
+            [],
+            [{'path': ['id'], 'message': "'x' is not of type 'integer'"}],
+            [{'path': [], 'message': "'id' is a required property"}],
+            [],
+        ]
+
+    def collection(self, compact=False):
+        return Resource.from_data(
+            'http://a.com/items', data=self.items, schema=self.schema,
+            session=self.session, compact=compact)
+
+    @unittest_run_loop
+    async def test_validate_items_returns_errors_per_item(self):
+        self.assertEqual(await self.collection().validate_items(),
+                         self.expected)
+
+    @unittest_run_loop
+    async def test_validate_items_of_compact_resources(self):
+        self.assertEqual(
+            await self.collection(compact=True).validate_items(),
+            self.expected)
+
+    @unittest_run_loop
+    async def test_validate_many_accepts_resources(self):
+        item_schema = Schema('http://a.com/list#/definitions/item',
+                             raw_schema=self.raw_schema, session=self.session)
+        resources = [self.resource_from_data('/i', data=item)
+                     for item in self.items]
+        self.assertEqual(await item_schema.validate_many(resources),
+                         self.expected)
+
+    @unittest_run_loop
+    async def test_stops_on_first_invalid_item(self):
+        self.assertEqual(
+            await self.collection().validate_items(stop_on_first=True),
+            self.expected[:2])
+
+    @patch('async_pluct.validation.validator_for')
+    @unittest_run_loop
+    async def test_compiles_schema_once(self, validator_for):
+        validator_for.return_value.return_value.iter_errors.return_value = []
+        await self.collection().validate_items()
+        await self.collection().validate_items()
+        self.assertEqual(validator_for.call_count, 1)
+
+    @unittest_run_loop
+    async def test_splits_chunks_across_thread_pool(self):
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(
+                await self.collection().validate_items(
+                    executor=executor, chunk_size=1),
+                self.expected)
+            self.assertEqual(
+                await self.collection().validate_items(
+                    stop_on_first=True, executor=executor, chunk_size=3),
+                self.expected[:2])
+
+    @unittest_run_loop
+    async def test_splits_chunks_across_process_pool(self):
+        with ProcessPoolExecutor(1) as executor:
+            self.assertEqual(
+                await self.collection().validate_items(
+                    executor=executor, chunk_size=3),
+                self.expected)
+
+    @unittest_run_loop
+    async def test_requires_a_schema(self):
+        collection = Resource.from_data(
+            'http://a.com/items', data=self.items, session=self.session)
+        with self.assertRaises(ValueError):
+            await collection.validate_items()
+
+
 class ParseResourceTestCase(BaseTestCase):
 
     def setUp(self):
@@ -204,6 +482,62 @@ class ParseResourceTestCase(BaseTestCase):
         self.assertEqual(item.data['id'], 111)
         self.assertEqual(item.schema, self.item_schema)
 
+    def test_reuses_child_resources(self):
+        data = {'objects': [{'id': 111}]}
+        app = self.resource_from_data(
+            url="appurl.com", data=data, schema=self.schema)
+
+        self.assertIs(app['objects'], app['objects'])
+        self.assertIs(app['objects'][0], app['objects'][0])
+
+    def test_child_resources_share_data(self):
+        data = {'objects': [{'id': 111}], 'empty': {}}
+        app = self.resource_from_data(
+            url="appurl.com", data=data, schema=self.schema)
+
+        app['objects'][0]['id'] = 222
+        app['empty']['key'] = 'value'
+
+        self.assertEqual(data['objects'][0]['id'], 222)
+        self.assertEqual(data['empty'], {'key': 'value'})
+
+    def test_invalidates_child_when_item_is_replaced(self):
+        data = {'objects': [{'id': 111}]}
+        app = self.resource_from_data(
+            url="appurl.com", data=data, schema=self.schema)
+        objects = app['objects']
+
+        app['objects'] = [{'id': 222}]
+        self.assertIsNot(app['objects'], objects)
+        self.assertEqual(app['objects'][0].data, {'id': 222})
+
+        app.data['objects'][0] = {'id': 333}
+        self.assertEqual(app['objects'][0].data, {'id': 333})
+
+    @patch('async_pluct.resource._item_schema')
+    def test_computes_child_schema_lazily(self, item_schema):
+        data = {'objects': [{'id': 111}]}
+        app = self.resource_from_data(
+            url="appurl.com", data=data, schema=self.schema)
+
+        objects = app['objects']
+        self.assertFalse(item_schema.called)
+
+        self.assertIs(objects.schema, item_schema.return_value)
+        item_schema.assert_called_once_with(
+            self.schema, '/properties/objects', self.session)
+
+    def test_children_dont_keep_their_parent_alive(self):
+        app = self.resource_from_data(
+            url="appurl.com", data={'objects': [{'id': 111}]},
+            schema=self.schema)
+        objects = app['objects']
+        parent = weakref.ref(app)
+        del app
+
+        self.assertIs(parent(), None)
+        self.assertEqual(objects.schema['type'], 'array')
+
     def test_eq_operators(self):
         data = {
             'objects': [
@@ -323,3 +657,127 @@ class ResourceFromDataTestCase(BaseTestCase):
         self.assertIsInstance(resource, ObjectResource)
         self.assertEqual(resource.url, '/')
         self.assertEqual(resource.data, data)
+
+    @unittest_run_loop
+    async def test_keeps_item_schemas_per_parent_schema(self):
+        def parent_schema(url, rel):
+            return Schema(url, raw_schema={'properties': {'author': {
+                'links': [{'rel': rel, 'href': '/author'}]}}},
+                session=self.session)
+
+        ra = self.resource_from_data(
+            '/a', data={'author': {}}, schema=parent_schema('/a', 'a-only'))
+        rb = self.resource_from_data(
+            '/b', data={'author': {}}, schema=parent_schema('/b', 'b-only'))
+
+        self.assertTrue(ra['author'].has_rel('a-only'))
+        self.assertTrue(rb['author'].has_rel('b-only'))
+        self.assertTrue(ra['author'].has_rel('a-only'))
+        self.assertFalse(ra['author'].has_rel('b-only'))
+        self.assertIs(ra.item_schema('author'), ra['author'].schema)
+
+
+class CompactResourceTestCase(BaseTestCase):
+
+    async def setUpAsync(self):
+        self.session = Session(compact=True)
+
+        self.item_schema = {
+            'type': 'object',
+            'properties': {'id': {'type': 'integer'}},
+        }
+        self.schema = Schema(
+            href="url.com",
+            raw_schema={
+                'type': 'object',
+                'properties': {
+                    'objects': {'type': 'array', 'items': self.item_schema},
+                },
+            },
+            session=self.session)
+        self.data = {'objects': [{'id': 111}], 'name': 'compact'}
+        self.resource = self.resource_from_data(
+            '/', data=self.data, schema=self.schema)
+
+    def test_creates_compact_resources_from_session(self):
+        self.assertIsInstance(self.resource, CompactObjectResource)
+        self.assertIsInstance(self.resource['objects'], CompactArrayResource)
+
+    def test_keeps_builtin_and_resource_types(self):
+        self.assertIsInstance(self.resource, dict)
+        self.assertIsInstance(self.resource, Resource)
+        self.assertIsInstance(self.resource['objects'], list)
+
+    def test_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.resource, '__dict__'))
+        self.assertFalse(hasattr(self.resource['objects'], '__dict__'))
+
+    def test_data_is_the_resource_itself(self):
+        self.assertIs(self.resource.data, self.resource)
+        self.assertEqual(self.resource, self.data)
+
+    def test_replaces_children_in_place(self):
+        objects = self.resource['objects']
+        self.assertIs(self.resource['objects'], objects)
+        self.assertIs(objects[0], self.resource['objects'][0])
+
+        objects[0]['id'] = 222
+        self.assertEqual(json.loads(json.dumps(self.resource)), {
+            'objects': [{'id': 222}], 'name': 'compact'})
+
+    def test_attaches_item_schemas(self):
+        self.assertEqual(
+            self.resource['objects'][0].schema, self.item_schema)
+
+    def test_iterating_arrays_yields_resources(self):
+        objects = self.resource['objects']
+        for items in (list(objects), list(reversed(objects)),
+                      [item for _, item in objects.iterate_items()]):
+            self.assertIsInstance(items[0], CompactObjectResource)
+            self.assertIs(items[0], objects[0])
+            self.assertEqual(items[0].schema, self.item_schema)
+
+    def test_mapping_reads_return_resources(self):
+        objects = self.resource['objects']
+        self.assertIs(self.resource.get('objects'), objects)
+        self.assertIs(self.resource.get('missing'), None)
+        self.assertIn(objects, list(self.resource.values()))
+        self.assertIn(('objects', objects), list(self.resource.items()))
+        self.assertIn(
+            ('objects', objects), list(self.resource.iterate_items()))
+
+    def test_pop_returns_resources(self):
+        popped = self.resource['objects'].pop()
+        self.assertIsInstance(popped, CompactObjectResource)
+        self.assertEqual(popped.schema, self.item_schema)
+        self.assertEqual(self.resource['objects'], [])
+
+        objects = self.resource.pop('objects')
+        self.assertIsInstance(objects, CompactArrayResource)
+        self.assertNotIn('objects', self.resource)
+        self.assertEqual(self.resource.pop('objects', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            self.resource.pop('objects')
+
+    def test_repr(self):
+        resource = self.resource_from_data('/', data={'name': 'compact'})
+        self.assertEqual(
+            repr(resource), "<Pluct ObjectResource {'name': 'compact'}>")
+
+    def test_uses_less_memory_per_instance(self):
+        def allocated(compact, count=1000):
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            resources = [
+                Resource.from_data(
+                    '/', data={'id': i}, session=self.session,
+                    compact=compact)
+                for i in range(count)]
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+            self.assertEqual(len(resources), count)
+            stats = after.compare_to(before, 'filename')
+            return sum(stat.size_diff for stat in stats) / count
+
+        self.assertLess(allocated(compact=True), allocated(compact=False) / 2)
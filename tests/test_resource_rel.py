@@ -2,12 +2,14 @@ from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
 from aiohttp import web
 from asynctest import patch, Mock
 
+import asyncio
 import json
 
 from copy import deepcopy
 
 from async_pluct.resource import Resource, get_content_type_for_resource
 from async_pluct.schema import Schema
+from async_pluct.scheduler import HIGH
 from async_pluct.session import Session
 
 
@@ -85,6 +87,13 @@ class ResourceRelTestCase(AioHTTPTestCase):
             headers=self.response.headers
         )
 
+    @unittest_run_loop
+    async def test_rel_passes_priority_through(self):
+        self.request.return_value = self.response
+        await self.resource.rel('item', priority=HIGH)
+        self.request.assert_called_with(
+            'http://much.url.com/root/123', method='GET', priority=HIGH)
+
     @unittest_run_loop
     async def test_get_content_type_for_resource_default(self):
         content_type = get_content_type_for_resource(self.resource)
@@ -184,3 +193,112 @@ class ResourceRelTestCase(AioHTTPTestCase):
             'http://much.url.com/root/345',
             method='GET', params={'fields': 'slug'}
         )
+
+    @unittest_run_loop
+    async def test_rel_many_follows_links_in_order(self):
+        self.request.return_value = self.response
+        results = await self.resource.rel_many(
+            ['list', ('item', {'params': {'id': 345}})])
+
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0], Resource)
+        self.request.assert_any_call('http://much.url.com/root', method='GET')
+        self.request.assert_any_call(
+            'http://much.url.com/root/345', method='GET', params={})
+
+    @unittest_run_loop
+    async def test_rel_many_returns_errors_per_item(self):
+        self.request.return_value = self.response
+        results = await self.resource.rel_many(['list', 'missing'])
+
+        self.assertIsInstance(results[0], Resource)
+        self.assertIsInstance(results[1], AttributeError)
+
+    @unittest_run_loop
+    async def test_iter_rel_many_yields_indexed_results(self):
+        self.request.return_value = self.response
+        indexes = [index async for index, _ in self.resource.iter_rel_many(
+            ['list', 'item'], concurrency=1)]
+        self.assertEqual(sorted(indexes), [0, 1])
+
+
+class ResourcePaginateTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.session = Session()
+        next_schema = Schema(
+            '/paged-schema',
+            raw_schema={'links': [{'rel': 'next', 'href': '/items/{next}'}]},
+            session=self.session)
+        last_schema = Schema(
+            '/last-schema', raw_schema={'links': []}, session=self.session)
+
+        self.pages = [
+            Resource.from_data(
+                'http://example.com/items/%d' % number,
+                data={'items': [{'id': number * 10}, {'id': number * 10 + 1}],
+                      'next': number + 1},
+                schema=next_schema if number < 3 else last_schema,
+                session=self.session)
+            for number in range(1, 4)]
+        self.requested = []
+
+        async def resource(url, **kwargs):
+            self.requested.append(url)
+            await asyncio.sleep(0)
+            return self.pages[int(url.rsplit('/', 1)[1]) - 1]
+
+        self.resource_patcher = patch.object(
+            self.session, 'resource', side_effect=resource)
+        self.resource_patcher.start()
+
+    async def tearDownAsync(self):
+        self.resource_patcher.stop()
+
+    @unittest_run_loop
+    async def test_yields_items_of_every_page(self):
+        ids = [item['id'] async for item in self.pages[0].paginate(
+            items_key='items')]
+        self.assertEqual(ids, [10, 11, 20, 21, 30, 31])
+
+    @unittest_run_loop
+    async def test_yields_pages(self):
+        pages = [page async for page in self.pages[0].paginate(pages=True)]
+        self.assertEqual(pages, self.pages)
+
+    @unittest_run_loop
+    async def test_follows_rel_without_prefetch(self):
+        pages = [page async for page in self.pages[0].paginate(
+            pages=True, prefetch=0)]
+        self.assertEqual(pages, self.pages)
+        self.assertEqual(self.requested, [
+            'http://example.com/items/2', 'http://example.com/items/3'])
+
+    @unittest_run_loop
+    async def test_prefetches_next_pages(self):
+        pages = self.pages[0].paginate(pages=True, prefetch=2)
+        await pages.__anext__()
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.requested), 2)
+        await pages.aclose()
+
+    @unittest_run_loop
+    async def test_stops_without_schema(self):
+        resource = Resource.from_data(
+            '/', data=[{'id': 1}], session=self.session)
+        items = [item async for item in resource.paginate()]
+        self.assertEqual([item.data for item in items], [{'id': 1}])
+
+    @unittest_run_loop
+    async def test_requires_items_key_for_object_pages(self):
+        with self.assertRaises(ValueError):
+            [item async for item in self.pages[0].paginate()]
+
+    @unittest_run_loop
+    async def test_propagates_errors(self):
+        self.session.resource.side_effect = ValueError('boom')
+        with self.assertRaises(ValueError):
+            [page async for page in self.pages[0].paginate(pages=True)]
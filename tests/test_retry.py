@@ -0,0 +1,94 @@
+from unittest import TestCase
+
+from aiohttp import ClientConnectionError
+from asynctest import patch
+
+from async_pluct.retry import HedgePolicy, RetryPolicy, parse_retry_after
+
+
+class StatusError(Exception):
+
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+
+class ParseRetryAfterTestCase(TestCase):
+
+    def test_parses_seconds(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+
+    def test_parses_http_date(self):
+        delay = parse_retry_after(
+            'Mon, 01 Jan 2018 00:01:00 GMT', clock=lambda: 1514764800)
+        self.assertEqual(delay, 60)
+
+    def test_ignores_invalid_values(self):
+        self.assertIs(parse_retry_after('soon'), None)
+        self.assertIs(parse_retry_after(None), None)
+
+
+class RetryPolicyTestCase(TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(total=2, backoff_factor=1, max_backoff=5)
+
+    def test_retries_idempotent_methods_on_retry_statuses(self):
+        self.assertTrue(self.policy.should_retry('GET', 0, StatusError(503)))
+        self.assertTrue(self.policy.should_retry('put', 1, StatusError(502)))
+
+    def test_does_not_retry_non_idempotent_methods(self):
+        self.assertFalse(
+            self.policy.should_retry('POST', 0, StatusError(503)))
+
+    def test_does_not_retry_client_errors(self):
+        self.assertFalse(self.policy.should_retry('GET', 0, StatusError(404)))
+
+    def test_retries_connection_errors(self):
+        self.assertTrue(
+            self.policy.should_retry('GET', 0, ClientConnectionError()))
+        self.assertTrue(self.policy.should_retry('GET', 0, StatusError(599)))
+
+    def test_stops_after_total_attempts(self):
+        self.assertFalse(self.policy.should_retry('GET', 2, StatusError(503)))
+
+    @patch('async_pluct.retry.random.uniform')
+    def test_backs_off_exponentially_with_jitter(self, uniform):
+        uniform.side_effect = lambda low, high: high
+        delays = [self.policy.backoff(attempt) for attempt in range(4)]
+        self.assertEqual(delays, [1, 2, 4, 5])
+        uniform.assert_called_with(0, 5)
+
+    def test_backs_off_without_jitter(self):
+        self.policy.jitter = False
+        self.assertEqual(self.policy.backoff(1), 2)
+
+    def test_respects_retry_after(self):
+        error = StatusError(503, {'retry-after': '3'})
+        self.assertEqual(self.policy.backoff(0, error), 3)
+
+    def test_caps_retry_after(self):
+        error = StatusError(503, {'retry-after': '3600'})
+        self.assertEqual(self.policy.backoff(0, error), 5)
+
+
+class HedgePolicyTestCase(TestCase):
+
+    def test_waits_for_enough_samples(self):
+        policy = HedgePolicy(min_samples=3)
+        policy.record(0.1)
+        self.assertIs(policy.delay(), None)
+
+    def test_uses_latency_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=10)
+        for latency in range(1, 11):
+            policy.record(latency / 10.0)
+        self.assertEqual(policy.delay(), 0.9)
+
+    def test_uses_fixed_delay(self):
+        self.assertEqual(HedgePolicy(delay=0.05).delay(), 0.05)
+
+    def test_applies_to_safe_methods(self):
+        policy = HedgePolicy()
+        self.assertTrue(policy.applies_to('get'))
+        self.assertFalse(policy.applies_to('POST'))
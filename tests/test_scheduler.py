@@ -0,0 +1,194 @@
+import asyncio
+
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+from aiohttp import web
+from asynctest import Mock, CoroutineMock
+
+from async_pluct.breaker import CircuitBreakers, CircuitOpenError
+from async_pluct.retry import HedgePolicy
+from async_pluct.scheduler import HIGH, LOW, Scheduler, TokenBucket
+from async_pluct.session import Session
+
+
+class TokenBucketTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    def test_refills_at_rate_up_to_capacity(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, burst=3, clock=lambda: now[0])
+
+        for _ in range(3):
+            self.assertEqual(bucket.wait_time(), 0)
+            bucket.take()
+        self.assertEqual(bucket.wait_time(), 0.5)
+
+        now[0] += 10
+        self.assertEqual(bucket.wait_time(), 0)
+        self.assertEqual(bucket.tokens, 3)
+
+
+class SchedulerTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.order = []
+        self.scheduler = Scheduler(rate=100, burst=1)
+
+    async def request(self, name, url='http://a.com/', priority=None):
+        kwargs = {}
+        if priority is not None:
+            kwargs['priority'] = priority
+        await self.scheduler.acquire(url, **kwargs)
+        self.order.append(name)
+
+    @unittest_run_loop
+    async def test_does_not_limit_hosts_without_rate(self):
+        scheduler = Scheduler()
+        await asyncio.gather(*[
+            scheduler.acquire('http://a.com/') for _ in range(100)])
+        self.assertEqual(scheduler.stats()['a.com']['tokens'], None)
+
+    @unittest_run_loop
+    async def test_spaces_requests_by_rate(self):
+        start = self.loop.time()
+        requests = []
+        for i in range(4):
+            requests.append(asyncio.ensure_future(self.request(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*requests)
+        self.assertGreaterEqual(self.loop.time() - start, 0.025)
+        self.assertEqual(self.order, [0, 1, 2, 3])
+
+    @unittest_run_loop
+    async def test_dispatches_higher_priority_first(self):
+        await self.request('first')
+        await asyncio.gather(
+            self.request('low', priority=LOW),
+            self.request('normal'),
+            self.request('high', priority=HIGH))
+        self.assertEqual(self.order, ['first', 'high', 'normal', 'low'])
+
+    @unittest_run_loop
+    async def test_limits_hosts_independently(self):
+        self.scheduler.rates['b.com'] = (1, 1)
+        await self.request('a1')
+        await self.request('b1', url='http://b.com/')
+        await asyncio.wait_for(self.request('a2'), 1)
+        self.assertEqual(self.scheduler.stats()['b.com']['waiting'], 0)
+
+    @unittest_run_loop
+    async def test_skips_cancelled_waiters(self):
+        url = 'http://slow.com/'
+        self.scheduler.rates['slow.com'] = (20, 1)
+        await self.request('first', url=url)
+        cancelled = asyncio.ensure_future(self.request('cancelled', url=url))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        await self.request('second', url=url)
+        self.assertEqual(self.order, ['first', 'second'])
+
+    @unittest_run_loop
+    async def test_try_acquire_takes_only_free_tokens(self):
+        self.assertTrue(self.scheduler.try_acquire('http://a.com/'))
+        self.assertFalse(self.scheduler.try_acquire('http://a.com/'))
+        self.assertTrue(Scheduler().try_acquire('http://a.com/'))
+
+
+class SessionSchedulerTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(return_value='response')
+        self.scheduler = Mock(acquire=CoroutineMock())
+        self.session = Session(
+            client=self.mock_client, scheduler=self.scheduler)
+
+    @unittest_run_loop
+    async def test_acquires_with_priority_before_fetching(self):
+        await self.session.request('http://a.com/', priority=HIGH)
+
+        self.scheduler.acquire.assert_called_once_with(
+            'http://a.com/', HIGH)
+        self.assertNotIn('priority', self.mock_client.fetch.call_args[1])
+
+    @unittest_run_loop
+    async def test_drops_priority_without_scheduler(self):
+        self.session.scheduler = None
+        await self.session.request('http://a.com/', priority=LOW)
+        self.assertNotIn('priority', self.mock_client.fetch.call_args[1])
+
+    @unittest_run_loop
+    async def test_rejects_open_circuits_before_waiting_for_a_token(self):
+        self.session.breakers = CircuitBreakers(failure_threshold=1)
+        self.session.breakers.for_url('http://a.com/').record_failure()
+
+        with self.assertRaises(CircuitOpenError):
+            await self.session.request('http://a.com/')
+        self.assertFalse(self.scheduler.acquire.called)
+
+    @unittest_run_loop
+    async def test_releases_half_open_trial_when_cancelled_waiting(self):
+        now = [0]
+        self.session.breakers = CircuitBreakers(
+            failure_threshold=1, recovery_timeout=1, clock=lambda: now[0])
+        breaker = self.session.breakers.for_url('http://a.com/')
+        breaker.record_failure()
+        now[0] = 1
+
+        async def wait_forever(url, priority):
+            await asyncio.Event().wait()
+
+        self.scheduler.acquire.side_effect = wait_forever
+
+        request = asyncio.ensure_future(
+            self.session.request('http://a.com/'))
+        await asyncio.sleep(0)
+        self.assertEqual(breaker.trials, 1)
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+        self.assertEqual(breaker.trials, 0)
+
+
+class SessionHedgeSchedulerTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.calls = []
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(side_effect=self.fetch)
+
+    async def fetch(self, url, **kwargs):
+        self.calls.append(url)
+        if len(self.calls) == 1:
+            await asyncio.sleep(0.1)
+            return 'slow'
+        return 'fast'
+
+    def session(self, burst):
+        return Session(
+            client=self.mock_client, hedge=HedgePolicy(delay=0.01),
+            scheduler=Scheduler(rate=0.01, burst=burst))
+
+    @unittest_run_loop
+    async def test_hedges_with_a_token_of_its_own(self):
+        session = self.session(burst=2)
+        self.assertEqual(await session.request('http://a.com/'), 'fast')
+        self.assertEqual(len(self.calls), 2)
+        self.assertLess(session.scheduler.stats()['a.com']['tokens'], 1)
+
+    @unittest_run_loop
+    async def test_does_not_hedge_without_a_free_token(self):
+        session = self.session(burst=1)
+        self.assertEqual(await session.request('http://a.com/'), 'slow')
+        self.assertEqual(len(self.calls), 1)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 
 from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
@@ -5,8 +6,10 @@ from aiohttp import web
 
 from copy import deepcopy
 
+from multidict import CIMultiDict
+
 from asynctest import patch, Mock
-from async_pluct.schema import get_profile_from_header, LazySchema, Schema, ResolveAsyncSchemaError  # noqa
+from async_pluct.schema import get_profile_from_content_type, get_profile_from_header, iter_external_refs, parse_content_type, LazySchema, Schema, ResolveAsyncSchemaError  # noqa
 from async_pluct.session import Session
 
 
@@ -150,6 +153,48 @@ class LazySchemaTestCase(BaseLazySchemaTestCase):
 
         self.request.assert_called_once_with('/schema', ttl=1234)
 
+    @unittest_run_loop
+    async def test_loads_schema_once_for_concurrent_waiters(self):
+        async def slow_request(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return self.response
+        self.request.side_effect = slow_request
+
+        other = LazySchema(self.HREF + '#/properties', session=self.session)
+        results = await asyncio.gather(
+            self.schema.raw_schema, self.schema.raw_schema, other.raw_schema)
+
+        self.request.assert_called_once_with('/schema')
+        self.assertEqual([r['title'] for r in results], [SCHEMA['title']] * 3)
+
+    @unittest_run_loop
+    async def test_cancelled_waiter_does_not_cancel_fetch(self):
+        async def slow_request(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return self.response
+        self.request.side_effect = slow_request
+
+        other = LazySchema(self.HREF + '#/properties', session=self.session)
+        cancelled = asyncio.ensure_future(other.raw_schema)
+        waiter = asyncio.ensure_future(self.schema.raw_schema)
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        raw_schema = await waiter
+        self.assertEqual(raw_schema['title'], SCHEMA['title'])
+        self.request.assert_called_once_with('/schema')
+
+    @unittest_run_loop
+    async def test_does_not_cache_failed_fetch(self):
+        self.request.side_effect = [ValueError('boom'), self.response]
+
+        with self.assertRaises(ValueError):
+            await self.schema.raw_schema
+
+        raw_schema = await self.schema.raw_schema
+        self.assertEqual(raw_schema['title'], SCHEMA['title'])
+        self.assertEqual(self.request.call_count, 2)
+
     @unittest_run_loop
     async def test_url(self):
         self.assertEqual(self.schema.url, '/schema')
@@ -241,6 +286,36 @@ class GetProfileFromHeaderTestCase(AioHTTPTestCase):
         url = get_profile_from_header(headers)
         self.assertEqual(url, self.SCHEMA_URL)
 
+    @unittest_run_loop
+    async def test_reads_multidict_headers_case_insensitively(self):
+        headers = CIMultiDict({
+            'Content-Type': 'application/json; profile=%s' % self.SCHEMA_URL
+        })
+        self.assertEqual(get_profile_from_header(headers), self.SCHEMA_URL)
+
+    @unittest_run_loop
+    async def test_memoizes_profile_per_content_type(self):
+        content_type = 'application/json; profile=%s' % self.SCHEMA_URL
+        get_profile_from_content_type(content_type)
+        hits = get_profile_from_content_type.cache_info().hits
+
+        get_profile_from_header({'content-type': content_type})
+
+        self.assertEqual(
+            get_profile_from_content_type.cache_info().hits, hits + 1)
+
+    def test_parses_quoted_parameters(self):
+        media_type, parameters = parse_content_type(
+            'Application/JSON; Profile="http://a.com/s;v=1"; '
+            'title="say \\"hi\\""; flag; charset = utf-8')
+
+        self.assertEqual(media_type, 'application/json')
+        self.assertEqual(parameters, {
+            'profile': 'http://a.com/s;v=1',
+            'title': 'say "hi"',
+            'charset': 'utf-8',
+        })
+
 
 class GetLinkTestCase(AioHTTPTestCase):
 
@@ -261,6 +336,28 @@ class GetLinkTestCase(AioHTTPTestCase):
         link = self.schema.get_link('missing')
         self.assertIs(link, None)
 
+    def test_returns_first_link_for_repeated_rel(self):
+        raw_schema = {'links': [
+            {'rel': 'item', 'href': '/first'},
+            {'rel': 'item', 'href': '/second'},
+        ]}
+        schema = Schema('/other', raw_schema=raw_schema, session=self.session)
+        self.assertEqual(schema.get_link('item')['href'], '/first')
+
+    def test_indexes_links_by_rel(self):
+        self.assertEqual(
+            self.schema.link_index, {'create': SCHEMA['links'][0]})
+        self.assertIs(self.schema.link_index, self.schema.link_index)
+
+    def test_reuses_compiled_template(self):
+        template = self.schema.get_template('create')
+        self.assertEqual(template.uri, '/api/content')
+        self.assertIs(self.schema.get_template('create'), template)
+
+    def test_returns_none_template_for_missing_link(self):
+        self.assertIs(self.schema.get_template('missing'), None)
+        self.assertIs(self.schema.expand_uri('missing'), None)
+
 
 class SchemaPointerTestCase(AioHTTPTestCase):
 
@@ -353,6 +450,100 @@ class SchemaPointerTestCase(AioHTTPTestCase):
         self.assertIsInstance(schema, Schema)
 
 
+class LazyRefExpansionTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.session = Session()
+        self.raw_schema = deepcopy(SCHEMA)
+        self.schema = Schema('http://example.org/schema',
+                             raw_schema=self.raw_schema, session=self.session)
+
+    def test_does_not_expand_refs_until_accessed(self):
+        self.assertTrue(self.schema.has_rel('create'))
+
+        properties = dict.__getitem__(self.schema.data, 'properties')
+        self.assertEqual(dict.__getitem__(properties, 'pointer'),
+                         {'$ref': '#/pointer'})
+
+    def test_reuses_expanded_refs(self):
+        properties = self.schema['properties']
+        self.assertIs(properties['external'], properties['external'])
+        self.assertIsInstance(properties['external'], LazySchema)
+
+    def test_expands_refs_on_items_values_and_get(self):
+        properties = self.schema['properties']
+        self.assertEqual(properties.get('pointer'), SCHEMA['pointer'])
+        self.assertEqual(dict(properties.items())['pointer'],
+                         SCHEMA['pointer'])
+        self.assertIn(SCHEMA['pointer'], properties.values())
+
+    def test_leaves_raw_schema_untouched(self):
+        self.schema['properties']['pointer']
+        self.schema['properties']['pointers']['items']['oneOf'][0]
+        self.assertEqual(self.raw_schema, SCHEMA)
+
+    def test_writes_go_through_to_raw_schema(self):
+        self.schema['required'] = ['name']
+        self.assertEqual(self.raw_schema['required'], ['name'])
+
+    def test_copies_raw_schema_regardless_of_reads(self):
+        properties = self.schema['properties']
+        before = (dict(properties), {**properties}, properties.copy())
+        properties['pointer']
+        properties['self']
+        after = (dict(properties), {**properties}, properties.copy())
+
+        self.assertEqual(before, after)
+        for copy in after:
+            self.assertEqual(copy, SCHEMA['properties'])
+        self.assertEqual(json.loads(json.dumps(after[0])),
+                         SCHEMA['properties'])
+
+    def test_serializes_views_without_refs(self):
+        links = self.schema['links']
+        links[0]['rel']
+        self.assertEqual(json.loads(json.dumps(links)), SCHEMA['links'])
+        self.assertEqual(json.loads(json.dumps(self.schema['pointer'])),
+                         SCHEMA['pointer'])
+
+    def test_dict_mutators_write_through_to_raw_schema(self):
+        properties = self.schema['properties']
+        raw = self.raw_schema['properties']
+        properties['pointer']
+
+        self.assertEqual(properties.setdefault('age', {'type': 'integer'}),
+                         {'type': 'integer'})
+        properties.update(pointer={'type': 'null'}, extra={})
+        self.assertEqual(properties['pointer'], {'type': 'null'})
+        self.assertEqual(properties.pop('extra'), {})
+        self.assertEqual(properties.pop('missing', None), None)
+        self.assertEqual(properties.popitem(), ('age', {'type': 'integer'}))
+        self.assertEqual(raw, dict(properties))
+        self.assertEqual(raw['pointer'], {'type': 'null'})
+        self.assertNotIn('age', raw)
+
+        properties.clear()
+        self.assertEqual(raw, {})
+        self.assertEqual(properties, {})
+
+    def test_list_mutators_write_through_to_raw_schema(self):
+        one_of = self.schema['properties']['pointers']['items']['oneOf']
+        raw = self.raw_schema['properties']['pointers']['items']['oneOf']
+        self.assertEqual(one_of[0], SCHEMA['pointer'])
+
+        one_of.append({'type': 'null'})
+        one_of.insert(0, {'type': 'boolean'})
+        self.assertEqual(one_of[1], SCHEMA['pointer'])
+        self.assertEqual(one_of.pop(1), SCHEMA['pointer'])
+        del one_of[0]
+        self.assertEqual(raw, [{'$ref': '#/pointer2'}, {'type': 'null'}])
+        self.assertEqual(one_of.copy(), raw)
+        self.assertEqual(one_of[0], SCHEMA['pointer2'])
+
+
 class LazySchemaPointerTestCase(BaseLazySchemaTestCase):
 
     HREF = '/schema#/properties/name'
@@ -423,3 +614,32 @@ class LazySchemaStoreTestCase(SchemaStoreMixinTestCase, AioHTTPTestCase):
         if session is None:
             session = self.session
         return LazySchema(self.SCHEMA_URL, session=session)
+
+    @unittest_run_loop
+    async def test_keeps_fetched_schema_when_reused(self):
+        schema = self.create_schema(self.SCHEMA_URL)
+        schema._raw_schema = {'type': 'object'}
+
+        reused = self.create_schema(self.SCHEMA_URL)
+        self.assertEqual(await reused.raw_schema, {'type': 'object'})
+
+
+class IterExternalRefsTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    def test_finds_nested_external_refs(self):
+        raw_schema = {
+            'properties': {
+                'local': {'$ref': '#/definitions/local'},
+                'author': {'$ref': 'http://a.com/author#/definitions/x'},
+                'tags': {
+                    'type': 'array',
+                    'items': [{'$ref': 'http://a.com/tag'}],
+                },
+            },
+        }
+        self.assertEqual(
+            sorted(iter_external_refs(raw_schema)),
+            ['http://a.com/author#/definitions/x', 'http://a.com/tag'])
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from async_pluct.schema_cache import DiskSchemaCache
+
+
+class DiskSchemaCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskSchemaCache(
+            self.directory, max_age=60, clock=lambda: self.now)
+        self.url = 'http://example.com/schema'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_misses_unknown_urls(self):
+        self.assertIsNone(self.cache.get(self.url))
+
+    def test_round_trips_schema_and_validators(self):
+        self.cache.set(self.url, {'type': 'object'}, etag='"v1"',
+                       last_modified='Mon, 01 Jan 2018 00:00:00 GMT')
+
+        entry = self.cache.get(self.url)
+        self.assertEqual(entry.url, self.url)
+        self.assertEqual(entry.schema, {'type': 'object'})
+        self.assertEqual(entry.fetched_at, 1000.0)
+        self.assertEqual(entry.conditional_headers(), {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Mon, 01 Jan 2018 00:00:00 GMT',
+        })
+
+    def test_survives_a_new_instance(self):
+        self.cache.set(self.url, {'type': 'object'})
+        cache = DiskSchemaCache(self.directory)
+        self.assertEqual(cache.get(self.url).schema, {'type': 'object'})
+
+    def test_leaves_no_temporary_files(self):
+        self.cache.set(self.url, {'type': 'object'})
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(self.cache.path(self.url))])
+
+    def test_ignores_corrupted_files(self):
+        with open(self.cache.path(self.url), 'w') as f:
+            f.write('{"url": ')
+        self.assertIsNone(self.cache.get(self.url))
+
+    def test_needs_revalidation_after_max_age(self):
+        entry = self.cache.set(self.url, {})
+        self.assertFalse(self.cache.needs_revalidation(entry))
+
+        self.now += 60
+        self.assertTrue(self.cache.needs_revalidation(entry))
+
+        entry = self.cache.touch(entry)
+        self.assertFalse(self.cache.needs_revalidation(entry))
+
+    def test_delete_and_clear(self):
+        self.cache.set(self.url, {})
+        self.cache.set(self.url + '2', {})
+
+        self.cache.delete(self.url)
+        self.assertIsNone(self.cache.get(self.url))
+
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.directory), [])
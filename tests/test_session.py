@@ -1,12 +1,22 @@
+import asyncio
 import json
+import shutil
+import tempfile
 
 from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
 from aiohttp import web
 from yarl import URL
-from aiohttp import ClientResponse, ClientResponseError
+from aiohttp import (
+    ClientConnectionError, ClientResponse, ClientResponseError)
 
 from asynctest import patch, Mock, CoroutineMock, ANY
-from async_pluct.session import Session
+from async_pluct.breaker import CircuitBreakers, CircuitOpenError
+from async_pluct.hooks import MetricsCollector
+from async_pluct.resource import ObjectResource
+from async_pluct.retry import HedgePolicy, RetryPolicy
+from async_pluct.schema import LazySchema
+from async_pluct.schema_cache import DiskSchemaCache
+from async_pluct.session import Session, coalescing_key
 
 
 class SessionInitializationTestCase(AioHTTPTestCase):
@@ -31,6 +41,22 @@ class SessionInitializationTestCase(AioHTTPTestCase):
         session = Session(client=custom_client)
         self.assertEqual(session.client, custom_client)
 
+    @unittest_run_loop
+    async def test_creates_client_from_transport_config(self):
+        transport = Mock()
+        with patch('async_pluct.session.create_client') as create_client:
+            session = Session(transport=transport)
+            create_client.assert_called_with(transport)
+            self.assertIs(session.client, create_client.return_value)
+
+    @unittest_run_loop
+    async def test_reports_pool_stats_from_client(self):
+        custom_client = Mock()
+        session = Session(client=custom_client)
+        with patch('async_pluct.session.pool_stats') as pool_stats:
+            self.assertIs(session.pool_stats(), pool_stats.return_value)
+            pool_stats.assert_called_with(custom_client)
+
 
 class SessionRequestsTestCase(AioHTTPTestCase):
 
@@ -152,3 +178,672 @@ class SessionResourceTestCase(AioHTTPTestCase):
             '/',
             raw_schema=json.loads(self.response.body),
             session=self.session)
+
+
+class SessionCacheTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.response = Mock()
+        self.response.status = 200
+        self.response.body = b'{"fake": "resource"}'
+        self.response.request.url = 'http://a.com/'
+        self.response.headers = {
+            'content-type': 'application/json',
+            'cache-control': 'max-age=60',
+            'etag': '"v1"',
+        }
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(return_value=self.response)
+
+        self.session = Session(client=self.mock_client, cache=True)
+
+    @unittest_run_loop
+    async def test_is_disabled_by_default(self):
+        self.assertIs(Session(client=self.mock_client).cache, None)
+
+    @unittest_run_loop
+    async def test_serves_fresh_responses_from_cache(self):
+        await self.session.request('http://a.com/')
+        response = await self.session.request('http://a.com/')
+
+        self.assertEqual(self.mock_client.fetch.call_count, 1)
+        self.assertEqual(response.body, self.response.body)
+
+    @unittest_run_loop
+    async def test_caches_requests_with_different_params_separately(self):
+        await self.session.request('http://a.com/')
+        await self.session.request('http://a.com/', params={'page': 2})
+        await self.session.request('http://a.com/', params={'page': 2})
+
+        self.assertEqual(self.mock_client.fetch.call_count, 2)
+        self.mock_client.fetch.assert_called_with(
+            'http://a.com/', method='GET', params={'page': 2},
+            headers={'content-type': 'application/json'})
+
+    @unittest_run_loop
+    async def test_revalidates_stale_responses(self):
+        self.response.headers['cache-control'] = 'no-cache'
+        await self.session.request('http://a.com/')
+
+        not_modified = Mock()
+        not_modified.status = 304
+        not_modified.headers = {'etag': '"v1"'}
+        self.mock_client.fetch.return_value = not_modified
+
+        response = await self.session.request('http://a.com/')
+
+        self.mock_client.fetch.assert_called_with(
+            'http://a.com/', method='GET',
+            headers={'content-type': 'application/json',
+                     'If-None-Match': '"v1"'})
+        self.assertEqual(response.body, self.response.body)
+
+    @unittest_run_loop
+    async def test_builds_resources_from_cached_responses(self):
+        await self.session.resource('http://a.com/')
+        resource = await self.session.resource('http://a.com/')
+
+        self.assertEqual(resource.data, {'fake': 'resource'})
+        self.assertEqual(resource.url, 'http://a.com/')
+
+
+class SessionResourcesTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.session = Session(concurrency=2)
+        self.error = ValueError('boom')
+
+        self.running = self.max_running = 0
+
+        async def resource(url, **kwargs):
+            if url == '/error':
+                raise self.error
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.001)
+            self.running -= 1
+            return (url, kwargs)
+
+        patch.object(self.session, 'resource', side_effect=resource).start()
+
+    async def tearDownAsync(self):
+        patch.stopall()
+
+    @unittest_run_loop
+    async def test_returns_resources_in_order(self):
+        results = await self.session.resources(
+            ['/a', ('/b', {'timeout': 10})])
+        self.assertEqual(results, [('/a', {}), ('/b', {'timeout': 10})])
+
+    @unittest_run_loop
+    async def test_returns_errors_per_item(self):
+        results = await self.session.resources(['/a', '/error'])
+        self.assertEqual(results, [('/a', {}), self.error])
+
+    @unittest_run_loop
+    async def test_iterates_resources_as_completed(self):
+        results = {}
+        async for index, result in self.session.iter_resources(
+                ['/a', '/error']):
+            results[index] = result
+        self.assertEqual(results, {0: ('/a', {}), 1: self.error})
+
+    @unittest_run_loop
+    async def test_shares_session_concurrency_between_batches(self):
+        urls = ['/{0}'.format(i) for i in range(5)]
+        await asyncio.gather(
+            self.session.resources(urls),
+            self.session.resources(urls, concurrency=1))
+        self.assertEqual(self.max_running, 2)
+
+
+async def stream_handler(request):
+    response = web.StreamResponse(headers={
+        'content-type': 'application/json; profile=/schema'})
+    await response.prepare(request)
+    await response.write(b'[{"id": 1}, {"id"')
+    await asyncio.sleep(0.01)
+    await response.write(b': 2}]')
+    await response.write_eof()
+    return response
+
+
+class SessionStreamResourceTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        app = web.Application()
+        app.router.add_get('/', stream_handler)
+        return app
+
+    async def setUpAsync(self):
+        self.session = Session()
+
+    async def tearDownAsync(self):
+        await self.session.close()
+
+    @unittest_run_loop
+    async def test_yields_item_resources(self):
+        url = self.server.make_url('/')
+        items = [item async for item in self.session.stream_resource(
+            url, chunk_size=4)]
+
+        self.assertEqual([item.data for item in items], [{'id': 1}, {'id': 2}])
+        self.assertIsInstance(items[0], ObjectResource)
+        self.assertEqual(items[0].url, url)
+
+    @unittest_run_loop
+    async def test_attaches_item_schema(self):
+        url = self.server.make_url('/')
+        items = [item async for item in self.session.stream_resource(url)]
+
+        self.assertEqual(items[0].schema.href, '#/items')
+        self.assertEqual(items[0].schema._raw_schema.url, '/schema')
+
+    @unittest_run_loop
+    async def test_falls_back_to_buffered_body(self):
+        response = Mock()
+        response.headers = {'content-type': 'application/json'}
+        response.body = b'[{"id": 1}]'
+        client = Mock(spec=['fetch'])
+        client.fetch = CoroutineMock(return_value=response)
+        session = Session(client=client)
+
+        items = [item async for item in session.stream_resource('/')]
+
+        self.assertEqual([item.data for item in items], [{'id': 1}])
+
+
+class SessionRetryTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    def make_response(self, status):
+        response = ClientResponse('get', URL('/'))
+        response.status = status
+        response.headers = {}
+        return response
+
+    async def setUpAsync(self):
+        self.ok = self.make_response(200)
+        self.unavailable = self.make_response(503)
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock()
+
+        self.session = Session(
+            client=self.mock_client,
+            retry=RetryPolicy(total=2, backoff_factor=0))
+
+    @unittest_run_loop
+    async def test_retries_transient_errors(self):
+        self.mock_client.fetch.side_effect = [self.unavailable, self.ok]
+
+        response = await self.session.request('/')
+
+        self.assertIs(response, self.ok)
+        self.assertEqual(self.mock_client.fetch.call_count, 2)
+
+    @unittest_run_loop
+    async def test_gives_up_after_total_retries(self):
+        self.mock_client.fetch.return_value = self.unavailable
+
+        with self.assertRaises(ClientResponseError):
+            await self.session.request('/')
+        self.assertEqual(self.mock_client.fetch.call_count, 3)
+
+    @unittest_run_loop
+    async def test_does_not_retry_post(self):
+        self.mock_client.fetch.return_value = self.unavailable
+
+        with self.assertRaises(ClientResponseError):
+            await self.session.request('/', method='POST')
+        self.assertEqual(self.mock_client.fetch.call_count, 1)
+
+
+class SessionHedgeTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.calls = []
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(side_effect=self.fetch)
+        self.session = Session(
+            client=self.mock_client, hedge=HedgePolicy(delay=0.01))
+
+    async def fetch(self, url, **kwargs):
+        self.calls.append(url)
+        if len(self.calls) == 1:
+            await asyncio.sleep(0.2)
+            return 'slow'
+        return 'fast'
+
+    @unittest_run_loop
+    async def test_takes_the_first_answer(self):
+        response = await self.session.request('/')
+        self.assertEqual(response, 'fast')
+        self.assertEqual(len(self.calls), 2)
+
+    @unittest_run_loop
+    async def test_does_not_hedge_fast_requests(self):
+        self.session.hedge.fixed_delay = 1
+        response = await self.session.request('/')
+        self.assertEqual(response, 'slow')
+        self.assertEqual(len(self.calls), 1)
+
+    @unittest_run_loop
+    async def test_does_not_hedge_unsafe_methods(self):
+        response = await self.session.request('/', method='POST')
+        self.assertEqual(response, 'slow')
+        self.assertEqual(len(self.calls), 1)
+
+
+class SessionHooksTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.response = Mock(status=200, headers={},
+                             body=b'{"type": "object"}')
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(return_value=self.response)
+        self.session = Session(client=self.mock_client)
+        self.metrics = MetricsCollector().attach(self.session.hooks)
+
+    @unittest_run_loop
+    async def test_does_not_emit_without_listeners(self):
+        self.metrics.detach(self.session.hooks)
+        with patch.object(self.session.hooks, 'emit') as emit:
+            await self.session.request_json('/')
+            self.assertFalse(emit.called)
+
+    @unittest_run_loop
+    async def test_emits_request_start_and_end(self):
+        listener = Mock()
+        self.session.hooks.on('request_end', listener)
+
+        await self.session.request('/')
+
+        self.assertEqual(self.metrics.counters['request_start'], 1)
+        listener.assert_called_once_with(
+            'request_end', url='/', method='GET', status=200, duration=ANY,
+            cached=False, error=None)
+
+    @unittest_run_loop
+    async def test_emits_request_errors(self):
+        error = ValueError()
+        self.mock_client.fetch.side_effect = error
+
+        with self.assertRaises(ValueError):
+            await self.session.request('/')
+
+        self.assertEqual(self.metrics.counters['request_end_error'], 1)
+
+    @unittest_run_loop
+    async def test_emits_schema_fetch_parse_and_store_events(self):
+        await self.session.schema('http://example.com/schema')
+        await self.session.schema('http://example.com/schema')
+
+        counters = self.metrics.counters
+        self.assertEqual(counters['schema_fetch'], 2)
+        self.assertEqual(counters['parse'], 2)
+        self.assertEqual(counters['store_miss'], 1)
+        self.assertEqual(counters['store_hit'], 1)
+        self.assertEqual(
+            self.metrics.histograms['request_end'].count, 2)
+
+
+class SessionSchemaCacheTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = 'http://example.com/schema'
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(return_value=Mock(
+            status=200, headers={'etag': '"v2"'},
+            body=b'{"title": "fresh"}'))
+        self.session = Session(client=self.mock_client,
+                               schema_cache=self.directory)
+
+    async def tearDownAsync(self):
+        shutil.rmtree(self.directory)
+
+    async def wait_revalidations(self):
+        await asyncio.gather(*self.session._revalidations.values())
+
+    def test_accepts_a_directory(self):
+        self.assertIsInstance(self.session.schema_cache, DiskSchemaCache)
+
+    @unittest_run_loop
+    async def test_downloads_and_stores_unknown_schemas(self):
+        schema = await self.session.schema(self.url)
+
+        self.assertEqual(schema['title'], 'fresh')
+        entry = self.session.schema_cache.get(self.url)
+        self.assertEqual(entry.schema, {'title': 'fresh'})
+        self.assertEqual(entry.etag, '"v2"')
+
+    @unittest_run_loop
+    async def test_lazy_schema_reads_from_disk_first(self):
+        self.session.schema_cache.set(self.url, {'title': 'cached'},
+                                      etag='"v1"')
+        self.mock_client.fetch.return_value = Mock(
+            status=304, headers={}, body=b'')
+
+        schema = LazySchema(self.url, session=self.session)
+        raw_schema = await schema.raw_schema
+        self.assertEqual(raw_schema, {'title': 'cached'})
+
+        await self.wait_revalidations()
+        self.mock_client.fetch.assert_called_once_with(
+            self.url, method='GET', headers={
+                'If-None-Match': '"v1"',
+                'content-type': 'application/json'})
+        self.assertEqual(
+            self.session.schema_cache.get(self.url).schema,
+            {'title': 'cached'})
+
+    @unittest_run_loop
+    async def test_revalidation_stores_new_versions(self):
+        self.session.schema_cache.set(self.url, {'title': 'cached'})
+
+        schema = await self.session.schema(self.url)
+        self.assertEqual(schema['title'], 'cached')
+
+        await self.wait_revalidations()
+        self.assertEqual(
+            self.session.schema_cache.get(self.url).schema,
+            {'title': 'fresh'})
+
+    @unittest_run_loop
+    async def test_revalidation_replaces_schema_in_memory(self):
+        self.session.schema_cache.set(self.url, {'title': 'cached'})
+        schema = LazySchema(self.url, session=self.session)
+        self.assertEqual(await schema.raw_schema, {'title': 'cached'})
+
+        await self.wait_revalidations()
+        self.session.schema_cache.max_age = 60
+
+        self.assertNotIn(self.url, self.session.store)
+        schema = LazySchema(self.url, session=self.session)
+        self.assertEqual(await schema.raw_schema, {'title': 'fresh'})
+        self.assertEqual(self.mock_client.fetch.call_count, 1)
+
+    @unittest_run_loop
+    async def test_revalidates_each_url_once_per_session(self):
+        self.session.schema_cache.set(self.url, {'title': 'fresh'})
+        self.mock_client.fetch.return_value = Mock(
+            status=200, headers={}, body=b'{"title": "fresh"}')
+
+        for _ in range(20):
+            schema = LazySchema(self.url, session=self.session)
+            self.assertEqual(await schema.raw_schema, {'title': 'fresh'})
+            await self.wait_revalidations()
+
+        self.assertEqual(self.mock_client.fetch.call_count, 1)
+        self.assertIn(self.url, self.session.store)
+        self.assertEqual(self.session.store.hits, 19)
+
+    @unittest_run_loop
+    async def test_reads_and_writes_disk_in_executor(self):
+        with patch.object(self.session, '_in_executor',
+                          CoroutineMock(return_value=None)) as in_executor:
+            await self.session.load_raw_schema(self.url)
+
+        self.assertEqual(
+            [call[0][0] for call in in_executor.call_args_list],
+            [self.session.schema_cache.get, self.session.schema_cache.set])
+
+    @unittest_run_loop
+    async def test_skips_revalidation_of_recent_entries(self):
+        self.session.schema_cache.max_age = 60
+        self.session.schema_cache.set(self.url, {'title': 'cached'})
+
+        await self.session.schema(self.url)
+
+        self.assertEqual(self.session._revalidations, {})
+        self.assertFalse(self.mock_client.fetch.called)
+
+    @unittest_run_loop
+    async def test_ignores_revalidation_errors(self):
+        self.session.schema_cache.set(self.url, {'title': 'cached'})
+        self.mock_client.fetch.side_effect = ValueError()
+
+        await self.session.schema(self.url)
+        await self.wait_revalidations()
+
+        self.assertEqual(
+            self.session.schema_cache.get(self.url).schema,
+            {'title': 'cached'})
+
+
+class SessionPreloadTestCase(AioHTTPTestCase):
+
+    SCHEMAS = {
+        'http://a.com/article': {
+            'properties': {
+                'author': {'$ref': 'http://a.com/person#/definitions/p'},
+                'tags': {'items': {'$ref': 'http://a.com/tag'}},
+                'self': {'$ref': '#'},
+            },
+        },
+        'http://a.com/person': {
+            'definitions': {'p': {'$ref': 'http://a.com/article'}},
+        },
+        'http://a.com/tag': {'type': 'string'},
+    }
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.running = 0
+        self.max_running = 0
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(side_effect=self.fetch)
+        self.session = Session(client=self.mock_client)
+
+    async def fetch(self, url, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if url not in self.SCHEMAS:
+            raise ValueError(url)
+        return Mock(headers={},
+                    body=json.dumps(self.SCHEMAS[url]).encode('utf-8'))
+
+    @unittest_run_loop
+    async def test_fetches_external_refs_recursively_once(self):
+        results = await self.session.preload(['http://a.com/article'])
+
+        self.assertEqual(set(results), set(self.SCHEMAS))
+        self.assertEqual(self.mock_client.fetch.call_count, 3)
+
+    @unittest_run_loop
+    async def test_preloaded_schemas_are_reused(self):
+        await self.session.preload(['http://a.com/article'])
+
+        schema = LazySchema('http://a.com/tag', session=self.session)
+        self.assertEqual(await schema.raw_schema, {'type': 'string'})
+        self.assertEqual(self.mock_client.fetch.call_count, 3)
+
+    @unittest_run_loop
+    async def test_preloaded_documents_serve_pointer_refs(self):
+        await self.session.preload(['http://a.com/article'])
+
+        schema = LazySchema(
+            'http://a.com/person#/definitions/p', session=self.session)
+        self.assertEqual(await schema.raw_schema,
+                         self.SCHEMAS['http://a.com/person'])
+        self.assertEqual(self.mock_client.fetch.call_count, 3)
+
+    @unittest_run_loop
+    async def test_resolves_refs_against_the_referring_url(self):
+        self.SCHEMAS = dict(self.SCHEMAS, **{
+            'http://a.com/schemas/list': {
+                'items': {'$ref': 'item.json#/definitions/item'}},
+            'http://a.com/schemas/item.json': {'definitions': {'item': {}}},
+        })
+        results = await self.session.preload(['http://a.com/schemas/list'])
+
+        self.assertEqual(list(results), [
+            'http://a.com/schemas/list', 'http://a.com/schemas/item.json'])
+        self.assertIsInstance(
+            results['http://a.com/schemas/item.json'], LazySchema)
+
+    @unittest_run_loop
+    async def test_bounds_concurrency(self):
+        await self.session.preload(list(self.SCHEMAS), concurrency=1)
+        self.assertEqual(self.max_running, 1)
+
+    @unittest_run_loop
+    async def test_reports_failures_in_place(self):
+        results = await self.session.preload(
+            ['http://a.com/tag', 'http://a.com/missing'])
+
+        self.assertIsInstance(results['http://a.com/tag'], LazySchema)
+        self.assertIsInstance(results['http://a.com/missing'], ValueError)
+
+
+class SessionCoalescingTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(side_effect=self.fetch)
+        self.session = Session(client=self.mock_client, coalesce=True)
+
+    async def fetch(self, url, **kwargs):
+        await asyncio.sleep(0.01)
+        response = Mock(headers={}, body=b'{"items": [1, 2]}')
+        response.request.url = url
+        return response
+
+    @unittest_run_loop
+    async def test_shares_concurrent_identical_gets(self):
+        first, second = await asyncio.gather(
+            self.session.resource('http://a.com/'),
+            self.session.resource('http://a.com/'))
+
+        self.assertEqual(self.mock_client.fetch.call_count, 1)
+        self.assertIs(first.response, second.response)
+
+    @unittest_run_loop
+    async def test_gives_each_caller_its_own_resource(self):
+        first, second = await asyncio.gather(
+            self.session.resource('http://a.com/'),
+            self.session.resource('http://a.com/'))
+
+        first['items'].append(3)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second['items'], [1, 2])
+
+    @unittest_run_loop
+    async def test_does_not_share_different_requests(self):
+        await asyncio.gather(
+            self.session.resource('http://a.com/'),
+            self.session.resource('http://a.com/', params={'page': 2}),
+            self.session.resource('http://a.com/', method='POST'))
+
+        self.assertEqual(self.mock_client.fetch.call_count, 3)
+
+    @unittest_run_loop
+    async def test_is_opt_in(self):
+        self.session.coalesce = False
+        await asyncio.gather(
+            self.session.resource('http://a.com/'),
+            self.session.resource('http://a.com/'))
+
+        self.assertEqual(self.mock_client.fetch.call_count, 2)
+
+    def test_coalescing_key(self):
+        self.assertEqual(
+            coalescing_key('http://a.com/', {'headers': {'Accept': 'a'}}),
+            coalescing_key('http://a.com/', {'headers': {'accept': 'a'}}))
+        self.assertNotEqual(
+            coalescing_key('http://a.com/', {'headers': {'accept': 'a'}}),
+            coalescing_key('http://a.com/', {'headers': {'accept': 'b'}}))
+        self.assertIsNone(
+            coalescing_key('http://a.com/', {'data': '{}'}))
+        self.assertIsNone(
+            coalescing_key('http://a.com/', {'method': 'DELETE'}))
+
+
+class SessionCircuitBreakerTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    async def setUpAsync(self):
+        self.mock_client = Mock()
+        self.mock_client.fetch = CoroutineMock(
+            side_effect=ClientConnectionError())
+        self.session = Session(
+            client=self.mock_client,
+            breakers=CircuitBreakers(failure_threshold=2))
+
+    async def fail(self, url='http://a.com/'):
+        with self.assertRaises(ClientConnectionError):
+            await self.session.request(url)
+
+    @unittest_run_loop
+    async def test_fails_fast_once_open(self):
+        await self.fail()
+        await self.fail()
+
+        with self.assertRaises(CircuitOpenError):
+            await self.session.request('http://a.com/other')
+        self.assertEqual(self.mock_client.fetch.call_count, 2)
+
+    @unittest_run_loop
+    async def test_keeps_other_hosts_closed(self):
+        await self.fail()
+        await self.fail()
+
+        self.mock_client.fetch.side_effect = None
+        self.mock_client.fetch.return_value = 'response'
+        self.assertEqual(
+            await self.session.request('http://b.com/'), 'response')
+
+    @unittest_run_loop
+    async def test_reports_circuit_stats_and_state_changes(self):
+        listener = self.session.hooks.on('circuit_state', Mock())
+        await self.fail()
+        await self.fail()
+
+        self.assertEqual(self.session.circuit_stats()['a.com']['state'],
+                         'open')
+        listener.assert_called_once_with(
+            'circuit_state', host='a.com', previous='closed', state='open')
+
+    @unittest_run_loop
+    async def test_keeps_calling_the_breakers_on_change(self):
+        on_change = Mock()
+        self.session = Session(
+            client=self.mock_client,
+            breakers=CircuitBreakers(failure_threshold=1, on_change=on_change))
+        listener = self.session.hooks.on('circuit_state', Mock())
+        await self.fail()
+
+        on_change.assert_called_once_with('a.com', 'closed', 'open')
+        self.assertTrue(listener.called)
+
+    def test_accepts_defaults(self):
+        session = Session(client=Mock(), breakers=True)
+        self.assertIsInstance(session.breakers, CircuitBreakers)
+        self.assertEqual(Session(client=Mock()).circuit_stats(), {})
@@ -0,0 +1,154 @@
+from unittest import TestCase
+
+from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
+from aiohttp import web
+
+from async_pluct.schema import Schema
+from async_pluct.session import Session
+from async_pluct.store import SchemaStore
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class SchemaStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = SchemaStore(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_stores_and_returns_schemas(self):
+        self.store['http://a.com/schema'] = 'schema'
+        self.assertIn('http://a.com/schema', self.store)
+        self.assertEqual(self.store['http://a.com/schema'], 'schema')
+        self.assertEqual(len(self.store), 1)
+
+    def test_get_returns_default_for_missing_href(self):
+        self.assertIs(self.store.get('http://a.com/schema'), None)
+
+    def test_counts_hits_and_misses(self):
+        self.store['http://a.com/schema'] = 'schema'
+        self.store.get('http://a.com/schema')
+        self.store.get('http://b.com/schema')
+
+        stats = self.store.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_evicts_least_recently_used_root(self):
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://b.com/schema'] = 'b'
+        self.store.get('http://a.com/schema')
+        self.store['http://c.com/schema'] = 'c'
+
+        self.assertIn('http://a.com/schema', self.store)
+        self.assertNotIn('http://b.com/schema', self.store)
+        self.assertEqual(self.store.evictions, 1)
+
+    def test_evicts_pointers_together_with_root(self):
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://a.com/schema#/items'] = 'a-items'
+        self.store['http://b.com/schema'] = 'b'
+        self.store['http://c.com/schema'] = 'c'
+
+        self.assertNotIn('http://a.com/schema', self.store)
+        self.assertNotIn('http://a.com/schema#/items', self.store)
+        self.assertEqual(self.store.evictions, 1)
+
+    def test_pointers_do_not_count_towards_maxsize(self):
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://a.com/schema#/items'] = 'a-items'
+        self.store['http://b.com/schema'] = 'b'
+
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.evictions, 0)
+
+    def test_expires_root_after_ttl(self):
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://a.com/schema#/items'] = 'a-items'
+        self.clock.now = 10
+
+        self.assertNotIn('http://a.com/schema#/items', self.store)
+        self.assertNotIn('http://a.com/schema', self.store)
+        self.assertEqual(self.store.expirations, 1)
+
+    def test_accepts_per_entry_ttl(self):
+        self.store.set('http://a.com/schema', 'a', ttl=100)
+        self.clock.now = 50
+        self.assertIn('http://a.com/schema', self.store)
+
+    def test_reports_evicted_and_expired_roots(self):
+        evicted = []
+        self.store.on_evict = evicted.append
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://b.com/schema'] = 'b'
+        self.store['http://c.com/schema'] = 'c'
+        self.clock.now = 10
+        self.store.get('http://b.com/schema')
+
+        self.assertEqual(
+            evicted, ['http://a.com/schema', 'http://b.com/schema'])
+
+    def test_deleting_root_drops_pointers(self):
+        self.store['http://a.com/schema'] = 'a'
+        self.store['http://a.com/schema#/items'] = 'a-items'
+        del self.store['http://a.com/schema']
+        self.assertEqual(len(self.store), 0)
+
+
+class SessionSchemaStoreTestCase(AioHTTPTestCase):
+
+    async def get_application(self):
+        return web.Application()
+
+    @unittest_run_loop
+    async def test_uses_unbounded_store_by_default(self):
+        session = Session()
+        self.assertIsInstance(session.store, SchemaStore)
+        self.assertIs(session.store.maxsize, None)
+        self.assertIs(session.store.ttl, None)
+
+    @unittest_run_loop
+    async def test_accepts_custom_store(self):
+        store = SchemaStore(maxsize=1)
+        session = Session(schema_store=store)
+
+        Schema('http://a.com/schema#/items', raw_schema={}, session=session)
+        Schema('http://b.com/schema', raw_schema={}, session=session)
+
+        self.assertIs(session.store, store)
+        self.assertNotIn('http://a.com/schema', store)
+        self.assertNotIn('http://a.com/schema#/items', store)
+        self.assertIn('http://b.com/schema', store)
+
+    @unittest_run_loop
+    async def test_drops_validators_of_evicted_schemas(self):
+        session = Session(schema_store=SchemaStore(maxsize=1))
+        session.store['http://a.com/schema'] = 'a'
+        session.validators.get('http://a.com/schema', {})
+        session.validators.get('http://a.com/schema#/items', {})
+        session.validators.get('http://b.com/schema', {})
+
+        session.store['http://b.com/schema'] = 'b'
+
+        self.assertNotIn('http://a.com/schema', session.validators)
+        self.assertNotIn('http://a.com/schema#/items', session.validators)
+        self.assertIn('http://b.com/schema', session.validators)
+
+    @unittest_run_loop
+    async def test_keeps_calling_the_store_on_evict(self):
+        evicted = []
+        session = Session(schema_store=SchemaStore(
+            maxsize=1, on_evict=evicted.append))
+        session.validators.get('http://a.com/schema', {})
+        session.store['http://a.com/schema'] = 'a'
+        session.store['http://b.com/schema'] = 'b'
+
+        self.assertEqual(evicted, ['http://a.com/schema'])
+        self.assertNotIn('http://a.com/schema', session.validators)
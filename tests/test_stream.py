@@ -0,0 +1,71 @@
+import json
+
+from unittest import TestCase
+
+from async_pluct.stream import JSONArrayParser
+
+
+DOCUMENT = [
+    {'name': 'café', 'tags': ['a', 'b']},
+    12,
+    3.5,
+    'string',
+    None,
+    True,
+    [1, [2, 3]],
+    {'text': 'a "quoted" ]} back\\slash', 'nested': [{'x': '['}]},
+    '\\"',
+]
+
+
+class JSONArrayParserTestCase(TestCase):
+
+    def parse(self, body, size):
+        parser = JSONArrayParser()
+        items = []
+        for start in range(0, len(body), size):
+            items.extend(parser.feed(body[start:start + size]))
+        parser.close()
+        return items
+
+    def test_parses_whole_body(self):
+        body = json.dumps(DOCUMENT).encode('utf-8')
+        self.assertEqual(self.parse(body, len(body)), DOCUMENT)
+
+    def test_parses_any_chunk_boundary(self):
+        body = json.dumps(DOCUMENT, ensure_ascii=False).encode('utf-8')
+        for size in range(1, 8):
+            self.assertEqual(self.parse(body, size), DOCUMENT)
+
+    def test_yields_items_before_array_ends(self):
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(b'[{"id": 1}, {"id": 2'), [{'id': 1}])
+        self.assertEqual(parser.feed(b'}]'), [{'id': 2}])
+
+    def test_keeps_unfinished_item_in_pieces(self):
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(b'[{"a": "x\\'), [])
+        self.assertEqual(parser.feed(b'"]}", "b": [1'), [])
+        self.assertEqual(len(parser._item), 2)
+        self.assertEqual(parser.feed(b']}]'), [{'a': 'x"]}', 'b': [1]}])
+
+    def test_parses_empty_array(self):
+        self.assertEqual(self.parse(b' [ ] ', 1), [])
+
+    def test_rejects_non_arrays(self):
+        with self.assertRaises(ValueError):
+            JSONArrayParser().feed(b'{"id": 1}')
+
+    def test_rejects_incomplete_arrays(self):
+        parser = JSONArrayParser()
+        parser.feed(b'[1, 2')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    def test_rejects_invalid_items(self):
+        with self.assertRaises(ValueError):
+            JSONArrayParser().feed(b'[tru, 1]')
+
+    def test_rejects_extra_data(self):
+        with self.assertRaises(ValueError):
+            JSONArrayParser().feed(b'[1] 2')